@@ -5,12 +5,21 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
+
+Serve it with ``uvicorn app.asgi:application``.
 """
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+# app.urls runs the API views on the bounded view pool, see core.offload
+os.environ.setdefault('ASGI_OFFLOAD_VIEWS', 'true')
+
+django.setup(set_prefix=False)
+
+# Run streaming responses on the view pool too, instead of the event loop.
+from core.offload import OffloadingASGIHandler  # noqa: E402
 
-application = get_asgi_application()
+application = OffloadingASGIHandler()
@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'core',
     'drf_spectacular',
     'rest_framework',
@@ -82,14 +83,100 @@ WSGI_APPLICATION = 'app.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.db',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
-        'PASSWORD': os.environ.get('DB_PASSWORD')
+        'PASSWORD': os.environ.get('DB_PASSWORD'),
+        # connections are returned to the pool when Django closes them at
+        # the end of a request, so CONN_MAX_AGE stays at 0
+        'POOL': {
+            # opened in the background on first use
+            'MIN_SIZE': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 20)),
+            # seconds to wait for a free connection
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            'MAX_IDLE': float(os.environ.get('DB_POOL_MAX_IDLE', 300)),
+            'MAX_LIFETIME': float(
+                os.environ.get('DB_POOL_MAX_LIFETIME', 3600)
+            ),
+            # ping connections idle for longer than this on checkout
+            'CHECK_AFTER': float(os.environ.get('DB_POOL_CHECK_AFTER', 30)),
+        },
     }
 }
 
+# set to false to open a connection per request as before
+if os.environ.get('DB_POOL', 'true').lower() != 'true':
+    del DATABASES['default']['POOL']
+
+# Comma separated read replica hosts for safe API reads. Without any, a
+# 'replica' alias on the primary host still exists so the router can be
+# exercised locally and in tests, but reads are not sent to it.
+DB_REPLICA_HOSTS = [
+    host for host in os.environ.get('DB_REPLICA_HOSTS', '').split(',')
+    if host
+]
+DATABASE_REPLICAS = []
+for index, host in enumerate(
+        DB_REPLICA_HOSTS or [DATABASES['default']['HOST']]):
+    alias = 'replica' if index == 0 else f'replica{index + 1}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'TEST': {'MIRROR': 'default'},
+    }
+    if 'POOL' in DATABASES['default']:
+        # every alias has its own pool in each process, so a process holds
+        # up to DB_POOL_MAX_SIZE plus this many connections per replica
+        DATABASES[alias]['POOL'] = {
+            **DATABASES['default']['POOL'],
+            'MIN_SIZE': int(os.environ.get('DB_REPLICA_POOL_MIN_SIZE', 0)),
+            'MAX_SIZE': int(os.environ.get(
+                'DB_REPLICA_POOL_MAX_SIZE',
+                DATABASES['default']['POOL']['MAX_SIZE'],
+            )),
+        }
+    if DB_REPLICA_HOSTS:
+        DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Seconds a user's reads stay on the primary after they write. The time of
+# the last write is stored on the primary, so clients need no cookies.
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 10))
+
+
+# Password hashing
+# https://docs.djangoproject.com/en/3.2/topics/auth/passwords/
+
+PASSWORD_HASHERS = [
+    'core.hashers.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
+# PBKDF2 iterations, 0 for Django's default
+PASSWORD_HASH_ITERATIONS = int(os.environ.get('PASSWORD_HASH_ITERATIONS', 0))
+# Threads that may hash passwords at once, and how many callers may wait
+PASSWORD_HASH_WORKERS = int(
+    os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1)
+)
+PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 16))
+
+# Under ASGI the API views run on this many threads, each with its own DB
+# connection, and at most ASGI_QUEUE requests wait before getting a 503
+ASGI_THREADS = int(
+    os.environ.get('ASGI_THREADS', min(32, (os.cpu_count() or 1) + 4))
+)
+ASGI_QUEUE = int(os.environ.get('ASGI_QUEUE', 256))
+# Route the API views through that pool; app.asgi turns this on, so WSGI
+# deployments keep plain sync views
+ASGI_OFFLOAD_VIEWS = os.environ.get(
+    'ASGI_OFFLOAD_VIEWS', 'false'
+).lower() == 'true'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -142,4 +229,90 @@ AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        'core.renderers.MessagePackRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+        'core.parsers.MessagePackParser',
+    ],
 }
+
+# Lifetime of API auth tokens in seconds, 0 to never expire
+AUTH_TOKEN_TTL = int(os.environ.get('AUTH_TOKEN_TTL', 60 * 60 * 24 * 30))
+# Replace a user's token every time they log in. Off by default, since
+# every device of a user shares the one token and rotating it signs the
+# others out.
+AUTH_TOKEN_ROTATE_ON_LOGIN = os.environ.get(
+    'AUTH_TOKEN_ROTATE_ON_LOGIN', 'false'
+).lower() == 'true'
+
+# 'db' issues DRF auth tokens, 'signed' issues short lived signed access
+# tokens with refresh tokens. Both kinds are accepted in either mode.
+AUTH_TOKEN_MODE = os.environ.get('AUTH_TOKEN_MODE', 'db')
+ACCESS_TOKEN_TTL = int(os.environ.get('ACCESS_TOKEN_TTL', 60 * 5))
+# Seconds between reloads of the revoked access token list, i.e. how long
+# other processes may still accept a token after it was revoked
+ACCESS_TOKEN_REVOCATION_REFRESH = int(
+    os.environ.get('ACCESS_TOKEN_REVOCATION_REFRESH', 10)
+)
+REFRESH_TOKEN_TTL = int(
+    os.environ.get('REFRESH_TOKEN_TTL', 60 * 60 * 24 * 30)
+)
+
+# In-process cache of token lookups used by CachedTokenAuthentication
+TOKEN_AUTH_CACHE_TTL = int(os.environ.get('TOKEN_AUTH_CACHE_TTL', 60))
+TOKEN_AUTH_CACHE_NEGATIVE_TTL = int(
+    os.environ.get('TOKEN_AUTH_CACHE_NEGATIVE_TTL', 5)
+)
+TOKEN_AUTH_CACHE_MAX_SIZE = int(
+    os.environ.get('TOKEN_AUTH_CACHE_MAX_SIZE', 10000)
+)
+
+# Cursor pagination for the recipe list endpoint
+RECIPE_PAGE_SIZE = int(os.environ.get('RECIPE_PAGE_SIZE', 100))
+RECIPE_MAX_PAGE_SIZE = int(os.environ.get('RECIPE_MAX_PAGE_SIZE', 1000))
+
+# Largest batch accepted by the bulk recipe create endpoint
+RECIPE_BULK_MAX_ITEMS = int(os.environ.get('RECIPE_BULK_MAX_ITEMS', 1000))
+
+# Rows fetched per server-side cursor round trip by the recipe export
+RECIPE_EXPORT_CHUNK_SIZE = int(
+    os.environ.get('RECIPE_EXPORT_CHUNK_SIZE', 2000)
+)
+
+# Serve recipe lists from values() rows instead of the model serializer
+RECIPE_FAST_SERIALIZER = os.environ.get(
+    'RECIPE_FAST_SERIALIZER', 'false'
+).lower() == 'true'
+
+# Caches
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# Recipe responses are keyed by data versions kept in the database, so a
+# per-process cache stays correct with many workers; a shared backend (e.g.
+# memcached) only raises the hit rate.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'recipes': {
+        'BACKEND': os.environ.get(
+            'RECIPE_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get('RECIPE_CACHE_LOCATION', 'recipes'),
+        'TIMEOUT': int(os.environ.get('RECIPE_CACHE_TIMEOUT', 60)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(
+                os.environ.get('RECIPE_CACHE_MAX_ENTRIES', 5000)
+            ),
+        },
+    },
+}
+
+RECIPE_CACHE_ALIAS = 'recipes'
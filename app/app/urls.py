@@ -22,7 +22,14 @@ from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
 
+from core.offload import offload_include
+from core.views import (
+    DatabasePoolStatsView,
+    RuntimeStatsView,
+)
 
+# run the API views on the bounded view pool when served under ASGI
+api_include = offload_include if settings.ASGI_OFFLOAD_VIEWS else include
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -32,8 +39,18 @@ urlpatterns = [
         SpectacularSwaggerView.as_view(url_name='api-schema'),
         name='api-docs'
     ),
-    path('api/user/', include('user.urls')),
-    path('api/recipe/', include('recipe.urls')),
+    path('api/user/', api_include('user.urls')),
+    path('api/recipe/', api_include('recipe.urls')),
+    path(
+        'api/health/db-pool/',
+        DatabasePoolStatsView.as_view(),
+        name='db-pool-stats',
+    ),
+    path(
+        'api/health/runtime/',
+        RuntimeStatsView.as_view(),
+        name='runtime-stats',
+    ),
 ]
 
 if settings.DEBUG:
@@ -44,5 +44,24 @@ class UserAdmin(BaseUserAdmin):
 
 
 admin.site.register(models.User, UserAdmin)
-admin.site.register(models.Recipe)
+
+
+class RecipeTagInline(admin.TabularInline):
+    """Edit a recipe's tags on the recipe page."""
+    model = models.RecipeTag
+    extra = 1
+
+
+class RecipeIngredientInline(admin.TabularInline):
+    """Edit a recipe's ingredients on the recipe page."""
+    model = models.RecipeIngredient
+    extra = 1
+
+
+class RecipeAdmin(admin.ModelAdmin):
+    """Admin for recipes, editing tags and ingredients inline."""
+    inlines = [RecipeTagInline, RecipeIngredientInline]
+
+
+admin.site.register(models.Recipe, RecipeAdmin)
 admin.site.register(models.Tag)
@@ -0,0 +1,187 @@
+"""
+Authentication classes for the APIs.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from core.tokens import (
+    InvalidToken,
+    verify_access_token,
+)
+
+
+class TokenCache:
+    """Thread safe in-process LRU of token key to (user, token) with TTL.
+
+    Entries are only invalidated in the process that saw the change, so
+    other processes may keep a stale entry until its TTL runs out.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for ``key`` or None when absent."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def evict_user(self, user_id):
+        """Drop every entry that authenticates ``user_id``."""
+        with self._lock:
+            stale = [
+                key for key, (_, (user, _token)) in self._entries.items()
+                if user is not None and user.pk == user_id
+            ]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache(settings.TOKEN_AUTH_CACHE_MAX_SIZE)
+
+
+def token_expires_at(token):
+    """Return when a token expires, or None if tokens never expire."""
+    if not settings.AUTH_TOKEN_TTL:
+        return None
+    return token.created + timedelta(seconds=settings.AUTH_TOKEN_TTL)
+
+
+def token_expired(token):
+    """Return True if a token is past its lifetime."""
+    expires = token_expires_at(token)
+    return expires is not None and expires <= timezone.now()
+
+
+def expired_token_cutoff():
+    """Return the creation time before which tokens have expired."""
+    return timezone.now() - timedelta(seconds=settings.AUTH_TOKEN_TTL)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches the token/user lookup.
+
+    Valid tokens are cached for ``TOKEN_AUTH_CACHE_TTL`` seconds and
+    rejected tokens for ``TOKEN_AUTH_CACHE_NEGATIVE_TTL`` seconds. Tokens
+    older than ``AUTH_TOKEN_TTL`` seconds are rejected using the creation
+    time loaded with the token, so expiry costs no extra query.
+    """
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is not None:
+            user, token = cached
+            if user is None:
+                raise AuthenticationFailed(_('Invalid token.'))
+        else:
+            try:
+                user, token = super().authenticate_credentials(key)
+            except AuthenticationFailed:
+                token_cache.set(
+                    key,
+                    (None, None),
+                    settings.TOKEN_AUTH_CACHE_NEGATIVE_TTL,
+                )
+                raise
+            token_cache.set(
+                key, (user, token), settings.TOKEN_AUTH_CACHE_TTL
+            )
+
+        if token_expired(token):
+            raise AuthenticationFailed(_('Token has expired.'))
+        # hand each request its own copy so changes made while
+        # handling one request never leak into another
+        return (copy.copy(user), token)
+
+
+class LazyUser(SimpleLazyObject):
+    """The user of a verified access token, loaded on first use.
+
+    The id and the authentication checks are answered without loading it,
+    so views that only filter by the user's id run no user query. Loading
+    a deleted or deactivated user fails authentication.
+    """
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user_id):
+        def load():
+            user = get_user_model()._default_manager.filter(
+                pk=user_id,
+            ).first()
+            if user is None or not user.is_active:
+                raise AuthenticationFailed(_('User inactive or deleted.'))
+            return user
+
+        super().__init__(load)
+        # set directly, LazyObject.__setattr__ would load the user
+        self.__dict__['_user_id'] = user_id
+
+    @property
+    def pk(self):
+        return self.__dict__['_user_id']
+
+    id = pk
+
+    def __bool__(self):
+        return True
+
+
+class SignedTokenAuthentication(TokenAuthentication):
+    """Authenticate signed ``Bearer`` access tokens without a query.
+
+    ``request.user`` is a ``LazyUser`` and ``request.auth`` the verified
+    ``AccessToken``.
+    """
+    keyword = 'Bearer'
+
+    def authenticate_credentials(self, key):
+        try:
+            access = verify_access_token(key)
+        except InvalidToken as exc:
+            raise AuthenticationFailed(str(exc))
+        return (LazyUser(access.user_id), access)
+
+
+# authentication classes shared by the API views
+API_AUTHENTICATION_CLASSES = [
+    CachedTokenAuthentication,
+    SignedTokenAuthentication,
+]
@@ -0,0 +1,78 @@
+"""
+Helpers shared by the benchmark management commands.
+"""
+
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+
+
+def measure(func, repeat):
+    """Call ``func`` ``repeat`` times and return wall and CPU seconds."""
+    wall = []
+    cpu = []
+    for _ in range(repeat):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        func()
+        cpu.append(time.process_time() - cpu_start)
+        wall.append(time.perf_counter() - wall_start)
+    return wall, cpu
+
+
+def per_second(count, seconds):
+    """Return ``count`` per second, guarding against a zero duration."""
+    return count / seconds if seconds else float('inf')
+
+
+def percentile(samples, point):
+    """Return the ``point`` percentile (0-100) of ``samples``."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = round(point / 100 * (len(ordered) - 1))
+    return ordered[index]
+
+
+def seed_recipes(email, count, nested):
+    """Create a user with ``count`` recipes sharing ``nested`` of each.
+
+    Callers run this inside a transaction they roll back afterwards.
+    """
+    user = get_user_model().objects.create_user(email=email, password=None)
+    tags = Tag.objects.bulk_create(
+        Tag(user=user, name=f'Tag {i}') for i in range(nested)
+    )
+    ingredients = Ingredient.objects.bulk_create(
+        Ingredient(user=user, name=f'Ingredient {i}')
+        for i in range(nested)
+    )
+    recipes = Recipe.objects.bulk_create(
+        Recipe(
+            user=user,
+            title=f'Recipe {i}',
+            time_minutes=i % 120,
+            price=Decimal('9.99'),
+            link='http://example.com/recipe.pdf',
+        )
+        for i in range(count)
+    )
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+        for recipe in recipes for tag in tags
+    )
+    Recipe.ingredients.through.objects.bulk_create(
+        Recipe.ingredients.through(
+            recipe_id=recipe.id,
+            ingredient_id=ingredient.id,
+        )
+        for recipe in recipes for ingredient in ingredients
+    )
+    return user
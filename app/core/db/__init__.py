@@ -0,0 +1,7 @@
+"""
+Postgres backend that reuses connections from an in-process pool.
+
+Use ``'ENGINE': 'core.db'`` with ``CONN_MAX_AGE`` left at 0: Django then
+"closes" the connection at the end of every request, which hands it back
+to the pool, under both WSGI and ASGI.
+"""
@@ -0,0 +1,67 @@
+"""
+Pooled variant of Django's PostgreSQL backend.
+"""
+
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base, creation
+
+from core.db.pool import (
+    close_all_pools,
+    get_pool,
+)
+
+POOL_OPTIONS = {
+    'MIN_SIZE': 'min_size',
+    'MAX_SIZE': 'max_size',
+    'TIMEOUT': 'timeout',
+    'MAX_IDLE': 'max_idle',
+    'MAX_LIFETIME': 'max_lifetime',
+    'CHECK_AFTER': 'check_after',
+}
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    """Close pooled connections so the test database can be dropped."""
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        close_all_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """Check connections out of a pool instead of opening new ones."""
+    creation_class = DatabaseCreation
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pool = None
+
+    def get_new_connection(self, conn_params):
+        pooled = self.settings_dict.get('POOL')
+        if pooled is None or self.alias == NO_DB_ALIAS:
+            return super().get_new_connection(conn_params)
+
+        pool = get_pool(
+            self.alias,
+            tuple(sorted((k, str(v)) for k, v in conn_params.items())),
+            {POOL_OPTIONS[k]: v for k, v in pooled.items()},
+        )
+        connection = pool.checkout(
+            lambda: super(DatabaseWrapper, self).get_new_connection(
+                conn_params
+            )
+        )
+        # the parent sets this when it opens a connection, which a reused
+        # one skips
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level
+        )
+        self._pool = pool
+        return connection
+
+    def _close(self):
+        if self._pool is None:
+            return super()._close()
+        pool, self._pool = self._pool, None
+        with self.wrap_database_errors:
+            pool.release(self.connection)
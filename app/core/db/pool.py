@@ -0,0 +1,281 @@
+"""
+Thread-safe pool of raw psycopg2 connections.
+
+The first checkout opens connections up to ``min_size`` on a background
+thread. Connections are handed out most recently used first, so under
+light load the extra ones sit idle long enough to be reaped back down to
+``min_size`` whenever one is checked out or released. A connection that
+has been idle longer than ``check_after`` is pinged before it is handed
+out, and one that is broken, older than ``max_lifetime`` or left
+mid-transaction and cannot be rolled back is closed instead of returned
+to the pool.
+"""
+
+import collections
+import threading
+import time
+
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """Raised when no connection frees up within the pool timeout."""
+
+
+class ConnectionPool:
+    """Keep between ``min_size`` and ``max_size`` connections open."""
+
+    def __init__(self, min_size=0, max_size=10, timeout=10.0,
+                 max_idle=300.0, max_lifetime=3600.0, check_after=30.0):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.check_after = check_after
+        self._cond = threading.Condition()
+        # (connection, released at) with the most recently used last
+        self._idle = collections.deque()
+        # id(connection) -> (opened at, generation)
+        self._opened = {}
+        self._generation = 0
+        self._size = 0
+        self._filler = None
+        self._in_use = 0
+        self._waiting = 0
+        self._checkouts = 0
+        self._created = 0
+        self._closed = 0
+        self._timeouts = 0
+        self._failed_checks = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+
+    def checkout(self, connect):
+        """Return an open connection, calling ``connect`` for new ones."""
+        started = time.monotonic()
+        while True:
+            conn, released = self._reserve(started)
+            if conn is None:
+                conn = self._open(connect)
+                break
+            if self._healthy(conn, released):
+                with self._cond:
+                    self._in_use += 1
+                    self._checkouts += 1
+                break
+            with self._cond:
+                self._failed_checks += 1
+                self._discard(conn)
+        self._warm_up(connect)
+        return conn
+
+    def release(self, conn):
+        """Return a connection to the pool, closing it if unusable."""
+        now = time.monotonic()
+        healthy = not conn.closed
+        if healthy and conn.get_transaction_status() != (
+                TRANSACTION_STATUS_IDLE):
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                healthy = False
+        with self._cond:
+            opened, generation = self._opened.get(id(conn), (now, None))
+            self._in_use -= 1
+            if (healthy and generation == self._generation and
+                    now - opened < self.max_lifetime):
+                self._idle.append((conn, now))
+            else:
+                self._discard(conn)
+            self._reap()
+            self._cond.notify()
+
+    def close_all(self):
+        """Close idle connections and those in use once released."""
+        with self._cond:
+            self._generation += 1
+            while self._idle:
+                conn, _ = self._idle.popleft()
+                self._discard(conn)
+            self._cond.notify_all()
+
+    def stats(self):
+        """Return pool occupancy and wait counters."""
+        with self._cond:
+            return {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                'checkouts': self._checkouts,
+                'created': self._created,
+                'closed': self._closed,
+                'timeouts': self._timeouts,
+                'failed_checks': self._failed_checks,
+                'wait_seconds': self._wait_seconds,
+                'max_wait_seconds': self._max_wait_seconds,
+            }
+
+    def _reserve(self, started):
+        """Take an idle connection, or reserve room for a new one (None)."""
+        deadline = started + self.timeout
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    self._reap()
+                    if self._idle:
+                        conn, released = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        conn, released = None, None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(
+                            f'No database connection available after '
+                            f'{self.timeout}s ({self.max_size} in use).'
+                        )
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+            waited = time.monotonic() - started
+            self._wait_seconds += waited
+            self._max_wait_seconds = max(self._max_wait_seconds, waited)
+        return conn, released
+
+    def _open(self, connect):
+        try:
+            conn = connect()
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._opened[id(conn)] = (time.monotonic(), self._generation)
+            self._created += 1
+            self._in_use += 1
+            self._checkouts += 1
+        return conn
+
+    def _warm_up(self, connect):
+        """Start filling the pool up to ``min_size`` unless already full."""
+        with self._cond:
+            if self._size >= self.min_size or (
+                    self._filler is not None and self._filler.is_alive()):
+                return
+            self._filler = threading.Thread(
+                target=self._fill,
+                args=(connect,),
+                name='db-pool-fill',
+                daemon=True,
+            )
+            self._filler.start()
+
+    def _fill(self, connect):
+        """Open idle connections until the pool holds ``min_size``."""
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+                generation = self._generation
+            try:
+                conn = connect()
+            except Exception:
+                # the next checkout tries again
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                return
+            with self._cond:
+                if generation != self._generation:
+                    # closed while connecting, e.g. before a database drop
+                    self._discard(conn)
+                    return
+                now = time.monotonic()
+                self._opened[id(conn)] = (now, generation)
+                self._created += 1
+                self._idle.append((conn, now))
+                self._cond.notify()
+
+    def _healthy(self, conn, released):
+        """Return whether an idle connection can be handed out."""
+        if conn.closed:
+            return False
+        opened, _ = self._opened.get(id(conn), (0, None))
+        now = time.monotonic()
+        if now - opened >= self.max_lifetime:
+            return False
+        if now - released < self.check_after:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if not conn.autocommit:
+                conn.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+    def _reap(self):
+        """Close connections idle past ``max_idle`` above ``min_size``.
+
+        Must be called with the lock held.
+        """
+        now = time.monotonic()
+        while (self._idle and self._size > self.min_size and
+               now - self._idle[0][1] >= self.max_idle):
+            conn, _ = self._idle.popleft()
+            self._discard(conn)
+
+    def _discard(self, conn):
+        """Close a connection and free its slot, with the lock held."""
+        self._opened.pop(id(conn), None)
+        self._size -= 1
+        self._closed += 1
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, params, options):
+    """Return the pool for ``alias``, creating it from ``options`` once.
+
+    The pool is replaced when the connection parameters change, as they
+    do when the test runner switches to the test database.
+    """
+    entry = _pools.get(alias)
+    if entry is None or entry[0] != params:
+        with _pools_lock:
+            entry = _pools.get(alias)
+            if entry is None or entry[0] != params:
+                if entry is not None:
+                    entry[1].close_all()
+                entry = _pools[alias] = (params, ConnectionPool(**options))
+    return entry[1]
+
+
+def all_stats():
+    """Return the stats of every pool keyed by database alias."""
+    return {
+        alias: pool.stats() for alias, (_, pool) in list(_pools.items())
+    }
+
+
+def close_all_pools():
+    """Close every pooled connection, e.g. before dropping a database."""
+    for _, pool in list(_pools.values()):
+        pool.close_all()
@@ -0,0 +1,80 @@
+"""
+Thread pool with a bounded backlog.
+
+``ThreadPoolExecutor`` queues without limit, so under overload callers
+wait longer and longer instead of being turned away. ``BoundedExecutor``
+admits at most ``workers + max_queue`` calls at a time and keeps the
+counters the stats endpoints report.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BoundedExecutor:
+    """Run calls on at most ``workers`` threads.
+
+    At most ``max_queue`` calls wait for a free worker; ``try_acquire``
+    refuses more than that straight away instead of letting them pile up.
+    """
+
+    def __init__(self, workers, max_queue, thread_name_prefix=''):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix=thread_name_prefix,
+        )
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_seconds = 0.0
+
+    def try_acquire(self):
+        """Reserve a slot without blocking, returning False when full."""
+        if self._slots.acquire(blocking=False):
+            with self._lock:
+                self._pending += 1
+            return True
+        with self._lock:
+            self._rejected += 1
+        return False
+
+    def submit(self, func, *args, **kwargs):
+        """Run ``func`` in a slot from ``try_acquire`` and return a future.
+
+        The slot is released once ``func`` returns or raises.
+        """
+        queued_at = time.monotonic()
+
+        def task():
+            with self._lock:
+                self._wait_seconds += time.monotonic() - queued_at
+                self._running += 1
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._pending -= 1
+                    self._completed += 1
+                self._slots.release()
+
+        return self._executor.submit(task)
+
+    def stats(self):
+        """Return queue depth and throughput counters."""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'running': self._running,
+                'queued': self._pending - self._running,
+                'completed': self._completed,
+                'rejected': self._rejected,
+                'wait_seconds': self._wait_seconds,
+            }
@@ -0,0 +1,21 @@
+"""
+Password hashers for the project.
+"""
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2 with the iteration count set by PASSWORD_HASH_ITERATIONS.
+
+    Keeps the ``pbkdf2_sha256`` algorithm name, so existing hashes still
+    verify and are re-encoded at the new cost on the next login.
+    """
+
+    @property
+    def iterations(self):
+        return (
+            settings.PASSWORD_HASH_ITERATIONS or
+            PBKDF2PasswordHasher.iterations
+        )
@@ -0,0 +1,98 @@
+"""
+Bounded worker pool for password hashing.
+
+Password hashing is deliberately expensive. Running it on a small fixed
+pool with a bounded queue stops a burst of logins from taking every
+worker thread; callers that cannot be queued get ``PoolSaturated``.
+"""
+
+import threading
+
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.db import connections
+
+from core.executor import BoundedExecutor
+
+
+class PoolSaturated(Exception):
+    """Raised when the hash pool queue is full."""
+
+
+class PasswordHashPool(BoundedExecutor):
+    """Run hashing work on at most ``workers`` threads.
+
+    At most ``max_queue`` calls wait for a free worker; more than that
+    are rejected straight away instead of piling up.
+    """
+
+    def __init__(self, workers, max_queue):
+        super().__init__(
+            workers,
+            max_queue,
+            thread_name_prefix='password-hash',
+        )
+
+    def run(self, func, *args, **kwargs):
+        """Run ``func`` on the pool and return its result."""
+        if not self.try_acquire():
+            raise PoolSaturated()
+        return self.submit(func, *args, **kwargs).result()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_hash_pool():
+    """Return the process wide password hash pool."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PasswordHashPool(
+                    settings.PASSWORD_HASH_WORKERS,
+                    settings.PASSWORD_HASH_QUEUE,
+                )
+    return _pool
+
+
+def set_password(user, raw_password):
+    """Hash and set ``user``'s password on the pool."""
+    get_hash_pool().run(user.set_password, raw_password)
+
+
+def _with_connections(func):
+    """Wrap ``func`` to use the calling thread's database connections.
+
+    The caller blocks until the pool returns, so its connections are idle
+    meanwhile and the backends see its transaction, as LiveServerThread
+    does for tests.
+    """
+    shared = [(alias, connections[alias]) for alias in connections]
+
+    def wrapper(*args, **kwargs):
+        for alias, connection in shared:
+            connection.inc_thread_sharing()
+            connections[alias] = connection
+        try:
+            return func(*args, **kwargs)
+        finally:
+            for alias, connection in shared:
+                del connections[alias]
+                connection.dec_thread_sharing()
+    return wrapper
+
+
+def authenticate_user(request, email, password):
+    """Return the user the configured backends accept, or None.
+
+    ``authenticate`` runs on the pool, since the backends hash the
+    password, and sends ``user_login_failed`` itself.
+    """
+    return get_hash_pool().run(
+        _with_connections(authenticate),
+        request,
+        username=email,
+        password=password,
+    )
@@ -0,0 +1,261 @@
+"""
+Parsing and loading for the ``import_recipes`` command.
+
+The parsing half only uses the standard library so it can run in worker
+processes. Loading copies a parsed batch into temporary staging tables
+with ``COPY`` and merges it into the recipe tables with a handful of
+set-based statements, whatever the size of the batch.
+"""
+
+import csv
+import io
+import json
+import re
+from decimal import Decimal, InvalidOperation
+
+FIELDS = (
+    'title', 'time_minutes', 'price', 'link', 'description',
+    'tags', 'ingredients',
+)
+# separates tag and ingredient names inside a CSV cell
+CSV_LIST_SEPARATOR = '|'
+# trailing zero decimals DRF's IntegerField accepts, as in "12.0"
+_zero_decimals = re.compile(r'\.0*\s*$')
+
+
+class RecordError(ValueError):
+    """Raised for an input record that cannot be imported."""
+
+
+def _text(item, name, max_length, required=False):
+    value = item.get(name)
+    if value is None or value == '':
+        if required:
+            raise RecordError(f'{name} is required')
+        return ''
+    value = str(value).strip()
+    if max_length and len(value) > max_length:
+        raise RecordError(f'{name} is longer than {max_length} characters')
+    return value
+
+
+def _integer(item, name):
+    value = item.get(name)
+    # bool is an int subclass, JSON true must not import as 1
+    if isinstance(value, bool):
+        raise RecordError(f'{name} must be an integer')
+    try:
+        return int(_zero_decimals.sub('', str(value)))
+    except ValueError:
+        raise RecordError(f'{name} must be an integer')
+
+
+def _names(value, max_length):
+    if value is None or value == '':
+        return ()
+    if isinstance(value, str):
+        value = value.split(CSV_LIST_SEPARATOR)
+    if not isinstance(value, list):
+        raise RecordError('tags and ingredients must be lists of names')
+    names = {}
+    for name in value:
+        if isinstance(name, dict):
+            name = name.get('name')
+        name = str(name or '').strip()
+        if not name:
+            continue
+        if len(name) > max_length:
+            raise RecordError(
+                f'name {name[:20]!r}... is longer than {max_length} '
+                f'characters'
+            )
+        # names are unique per user ignoring case
+        names.setdefault(name.lower(), name)
+    return tuple(names.values())
+
+
+def clean_record(item, limits):
+    """Return a validated record tuple in ``FIELDS`` order."""
+    if not isinstance(item, dict):
+        raise RecordError('expected an object')
+    time_minutes = _integer(item, 'time_minutes')
+    if not 0 <= time_minutes < 2 ** 31:
+        raise RecordError('time_minutes is out of range')
+    try:
+        price = Decimal(str(item.get('price')).strip())
+    except InvalidOperation:
+        raise RecordError('price must be a decimal number')
+    places = Decimal(1).scaleb(-limits['price_places'])
+    if not price.is_finite() or price != price.quantize(places) or (
+            abs(price) >= 10 ** (
+                limits['price_digits'] - limits['price_places'])):
+        raise RecordError(
+            f'price must have at most {limits["price_digits"]} digits '
+            f'and {limits["price_places"]} decimal places'
+        )
+    return (
+        _text(item, 'title', limits['title'], required=True),
+        time_minutes,
+        str(price),
+        _text(item, 'link', limits['link']),
+        _text(item, 'description', None),
+        _names(item.get('tags'), limits['name']),
+        _names(item.get('ingredients'), limits['name']),
+    )
+
+
+def parse_batch(fmt, header, items, limits):
+    """Parse ``(line number, raw)`` NDJSON lines or CSV rows.
+
+    Runs in a worker process. Returns ``(records, errors)`` where errors
+    are ``(line number, message)`` pairs.
+    """
+    records = []
+    errors = []
+    for line, raw in items:
+        try:
+            if fmt == 'csv':
+                item = dict(zip(header, raw))
+            else:
+                try:
+                    item = json.loads(raw)
+                except ValueError as exc:
+                    raise RecordError(f'invalid JSON: {exc}')
+            records.append(clean_record(item, limits))
+        except RecordError as exc:
+            errors.append((line, str(exc)))
+    return records, errors
+
+
+def read_batches(stream, fmt, batch_size):
+    """Yield ``(header, items)`` batches of ``(line number, raw)`` items.
+
+    Batches only depend on the input, so a resumed import can skip the
+    ones already loaded by counting.
+    """
+    if fmt == 'csv':
+        reader = csv.reader(stream)
+        header = [name.strip() for name in next(reader, [])]
+        items = ((reader.line_num, row) for row in reader if row)
+    else:
+        header = None
+        items = (
+            (number, line)
+            for number, line in enumerate(stream, 1)
+            if line.strip()
+        )
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield header, batch
+            batch = []
+    if batch:
+        yield header, batch
+
+
+STAGING_SQL = """
+-- left over when the batch runs in a savepoint of an outer transaction
+DROP TABLE IF EXISTS
+    import_recipe, import_recipe_tag, import_recipe_ingredient;
+CREATE TEMP TABLE import_recipe (
+    seq integer, id bigint, title text, time_minutes integer,
+    price numeric, link text, description text
+) ON COMMIT DROP;
+CREATE TEMP TABLE import_recipe_tag (seq integer, name text)
+    ON COMMIT DROP;
+CREATE TEMP TABLE import_recipe_ingredient (seq integer, name text)
+    ON COMMIT DROP;
+"""
+
+MERGE_SQL = [
+    # new names only, existing ones win ignoring case
+    """
+    INSERT INTO core_tag (user_id, name)
+    SELECT DISTINCT ON (lower(name)) %(user_id)s, name
+    FROM import_recipe_tag ORDER BY lower(name), name
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO core_ingredient (user_id, name)
+    SELECT DISTINCT ON (lower(name)) %(user_id)s, name
+    FROM import_recipe_ingredient ORDER BY lower(name), name
+    ON CONFLICT DO NOTHING
+    """,
+    # take ids up front so the links below can be joined on seq
+    """
+    UPDATE import_recipe
+    SET id = nextval(pg_get_serial_sequence('core_recipe', 'id'))
+    """,
+    """
+    INSERT INTO core_recipe (
+        id, user_id, title, time_minutes, price, link, description
+    )
+    SELECT id, %(user_id)s, title, time_minutes, price, link, description
+    FROM import_recipe ORDER BY seq
+    """,
+    """
+    INSERT INTO core_recipe_tags (recipe_id, tag_id)
+    SELECT r.id, t.id
+    FROM import_recipe_tag s
+    JOIN import_recipe r ON r.seq = s.seq
+    JOIN core_tag t
+        ON t.user_id = %(user_id)s AND lower(t.name) = lower(s.name)
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO core_recipe_ingredients (recipe_id, ingredient_id)
+    SELECT r.id, i.id
+    FROM import_recipe_ingredient s
+    JOIN import_recipe r ON r.seq = s.seq
+    JOIN core_ingredient i
+        ON i.user_id = %(user_id)s AND lower(i.name) = lower(s.name)
+    ON CONFLICT DO NOTHING
+    """,
+]
+
+
+def copy_rows(cursor, table, columns, rows):
+    """COPY ``rows`` into ``columns`` of ``table`` in one round trip."""
+    buffer = io.StringIO()
+    # quoting everything keeps empty strings from being read as NULL
+    csv.writer(buffer, quoting=csv.QUOTE_ALL).writerows(rows)
+    buffer.seek(0)
+    cursor.copy_expert(
+        f'COPY {table} ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)',
+        buffer,
+    )
+
+
+def load_batch(cursor, user_id, records):
+    """Merge parsed records into the user's recipes.
+
+    Must run inside a transaction, which drops the staging tables.
+    """
+    cursor.execute(STAGING_SQL)
+    copy_rows(
+        cursor,
+        'import_recipe',
+        ('seq', 'title', 'time_minutes', 'price', 'link', 'description'),
+        (
+            (seq, title, minutes, price, link, description)
+            for seq, (title, minutes, price, link, description, _, _)
+            in enumerate(records)
+        ),
+    )
+    copy_rows(
+        cursor,
+        'import_recipe_tag',
+        ('seq', 'name'),
+        ((seq, name) for seq, record in enumerate(records)
+         for name in record[5]),
+    )
+    copy_rows(
+        cursor,
+        'import_recipe_ingredient',
+        ('seq', 'name'),
+        ((seq, name) for seq, record in enumerate(records)
+         for name in record[6]),
+    )
+    for sql in MERGE_SQL:
+        cursor.execute(sql, {'user_id': user_id})
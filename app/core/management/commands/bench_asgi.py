@@ -0,0 +1,187 @@
+"""
+Django command to benchmark the recipe API under WSGI and ASGI
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from types import ModuleType
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+from django.urls import path, reverse
+
+from rest_framework.authtoken.models import Token
+
+from core.benchmark import (
+    per_second,
+    percentile,
+)
+from core.models import Recipe
+from core.offload import (
+    get_view_pool,
+    offload_include,
+)
+
+
+class Command(BaseCommand):
+    """Drive the same endpoint through both handlers in this process.
+
+    WSGI is run on ``--concurrency`` threads, as a threaded WSGI server
+    would. ASGI is run with ``--concurrency`` in-flight requests on one
+    event loop, first with Django's default sync view handling and then
+    with the views offloaded to the bounded pool. The recipe cache is
+    bypassed so every request runs the view and its queries.
+    """
+    help = 'Compare recipe API latency and throughput under WSGI and ASGI.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=64)
+        parser.add_argument('--recipes', type=int, default=50)
+        parser.add_argument('--host', default='localhost')
+
+    def handle(self, *args, **options):
+        # the handlers run on other threads and connections, so the seed
+        # data has to be committed and is removed again afterwards
+        user = get_user_model().objects.create_user(
+            email='bench-asgi@example.com',
+            password='bench-password',
+        )
+        try:
+            Recipe.objects.bulk_create(
+                Recipe(
+                    user=user,
+                    title=f'Recipe {i}',
+                    time_minutes=i % 60 + 1,
+                    price=Decimal('5.00'),
+                )
+                for i in range(options['recipes'])
+            )
+            token = Token.objects.create(user=user)
+            self.path = reverse('recipe:recipe-list')
+            self.auth = f'Token {token.key}'
+            self.host = options['host']
+
+            count = options['requests']
+            concurrency = options['concurrency']
+            uncached = {
+                **settings.CACHES,
+                settings.RECIPE_CACHE_ALIAS: {
+                    'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+                },
+            }
+            # the same API routes as app.urls with ASGI_OFFLOAD_VIEWS on
+            offloaded = ModuleType('bench_asgi_urls')
+            offloaded.urlpatterns = [
+                path('api/user/', offload_include('user.urls')),
+                path('api/recipe/', offload_include('recipe.urls')),
+            ]
+            with override_settings(CACHES=uncached):
+                self._report(
+                    'wsgi', count, *self._run_wsgi(count, concurrency)
+                )
+                self._report(
+                    'asgi', count, *self._run_asgi(count, concurrency)
+                )
+                with override_settings(ROOT_URLCONF=offloaded):
+                    self._report(
+                        'asgi+pool', count,
+                        *self._run_asgi(count, concurrency)
+                    )
+            self.stdout.write(str(get_view_pool().stats()))
+        finally:
+            user.delete()
+
+    def _report(self, name, count, seconds, latencies, errors):
+        self.stdout.write(
+            f'{name}: {per_second(count, seconds):.0f} req/s, '
+            f'p50 {percentile(latencies, 50) * 1000:.1f} ms, '
+            f'p95 {percentile(latencies, 95) * 1000:.1f} ms, '
+            f'p99 {percentile(latencies, 99) * 1000:.1f} ms, '
+            f'{errors} errors'
+        )
+
+    def _run_wsgi(self, count, concurrency):
+        """Return wall seconds, latencies and errors through WSGI."""
+        handler = WSGIHandler()
+        factory = RequestFactory(
+            HTTP_HOST=self.host,
+            HTTP_AUTHORIZATION=self.auth,
+        )
+        latencies = []
+        errors = 0
+        lock = threading.Lock()
+
+        def one(_):
+            nonlocal errors
+            environ = factory.get(self.path).environ
+            status = []
+            started = time.perf_counter()
+            body = handler(environ, lambda s, h: status.append(s))
+            b''.join(body)
+            body.close()
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if not status[0].startswith('200'):
+                    errors += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as clients:
+            list(clients.map(one, range(count)))
+        return time.perf_counter() - started, latencies, errors
+
+    def _run_asgi(self, count, concurrency):
+        """Return wall seconds, latencies and errors through ASGI."""
+        handler = ASGIHandler()
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': self.path,
+            'raw_path': self.path.encode(),
+            'query_string': b'',
+            'root_path': '',
+            'headers': [
+                (b'host', self.host.encode()),
+                (b'authorization', self.auth.encode()),
+            ],
+            'client': ('127.0.0.1', 0),
+            'server': (self.host, 80),
+        }
+        latencies = []
+        errors = 0
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def one(slots):
+            nonlocal errors
+            status = []
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+
+            async with slots:
+                started = time.perf_counter()
+                await handler(dict(scope), receive, send)
+                latencies.append(time.perf_counter() - started)
+            if status[0] != 200:
+                errors += 1
+
+        async def main():
+            slots = asyncio.Semaphore(concurrency)
+            await asyncio.gather(*(one(slots) for _ in range(count)))
+
+        started = time.perf_counter()
+        asyncio.run(main())
+        return time.perf_counter() - started, latencies, errors
@@ -0,0 +1,300 @@
+"""
+Django command to benchmark the API endpoints in process
+"""
+import json
+import platform
+import re
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+from django.db import connection, transaction
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+
+from core.benchmark import (
+    percentile,
+    seed_recipes,
+)
+from core.models import Recipe
+from recipe.cache import get_cache
+
+SAVEPOINT_SQL = re.compile(
+    r'\s*(SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT)\b', re.I,
+)
+
+
+class QueryCounter:
+    """Count and time the SQL run on a connection as an execute wrapper.
+
+    Savepoint statements are counted on their own: every atomic block of
+    a request opens one inside the benchmark's transaction, where
+    autocommit would not run any.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.savepoints = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        if SAVEPOINT_SQL.match(sql):
+            self.savepoints += 1
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.queries += 1
+
+
+class Command(BaseCommand):
+    """Call each endpoint through the full request stack for every size.
+
+    Every dataset is seeded in a transaction that is rolled back at the
+    end, so the database is left as it was. Latency and SQL are measured
+    in one pass and allocations in a second one, since tracing memory
+    slows every call down. Replicas are bypassed because they cannot see
+    the uncommitted data.
+    """
+    help = 'Benchmark API endpoint latency, SQL and allocations.'
+    # cleared from the recipe cache before every call, and measured warm
+    # again under a '-cached' name
+    CACHED_ENDPOINTS = ('recipes-list',)
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='10,100,1000',
+            help='Comma separated recipe counts of the seeded datasets.',
+        )
+        parser.add_argument('--nested', type=int, default=5)
+        parser.add_argument('--repeat', type=int, default=100)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--alloc-repeat',
+            type=int,
+            default=10,
+            help='Calls traced with tracemalloc, 0 to skip allocations.',
+        )
+        parser.add_argument(
+            '--endpoint',
+            action='append',
+            help='Only run this endpoint, may be given more than once.',
+        )
+        parser.add_argument(
+            '--label',
+            default='',
+            help='Stored in the JSON output, e.g. the commit measured.',
+        )
+        parser.add_argument(
+            '--json',
+            help='Write results as JSON to this file, or - for stdout.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',')]
+        except ValueError:
+            raise CommandError('--sizes must be comma separated integers')
+        if any(size < 1 for size in sizes):
+            raise CommandError('--sizes must be at least 1')
+        unknown = set(options['endpoint'] or ()) - set(self.endpoints())
+        if unknown:
+            raise CommandError(
+                f'Unknown endpoints {", ".join(sorted(unknown))}, choose '
+                f'from {", ".join(self.endpoints())}'
+            )
+        self.options = options
+        # text goes to stderr when stdout carries the JSON
+        self.log = self.stderr if options['json'] == '-' else self.stdout
+
+        results = []
+        with override_settings(DATABASE_REPLICAS=[]):
+            for size in sizes:
+                with transaction.atomic():
+                    results.extend(self._run_size(size))
+                    # leave the database as it was
+                    transaction.set_rollback(True)
+
+        if options['json']:
+            report = json.dumps({
+                'label': options['label'],
+                'created': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'token_mode': settings.AUTH_TOKEN_MODE,
+                'options': {
+                    name: options[name] for name in (
+                        'nested', 'repeat', 'warmup', 'alloc_repeat',
+                    )
+                },
+                'results': results,
+            }, indent=2)
+            if options['json'] == '-':
+                self.stdout.write(report)
+            else:
+                with open(options['json'], 'w') as file:
+                    file.write(report + '\n')
+
+    def endpoints(self):
+        """Return endpoint names in run order mapped to request factories.
+
+        Logging in runs last since it may rotate the token the others use.
+        """
+        endpoints = {
+            'recipes-list': lambda: self.client.get(
+                reverse('recipe:recipe-list'),
+            ),
+            'recipe-detail': lambda: self.client.get(self.detail_url),
+            'recipe-create': lambda: self.client.post(
+                reverse('recipe:recipe-list'),
+                {
+                    'title': 'Bench recipe',
+                    'time_minutes': 10,
+                    'price': '5.00',
+                    'tags': [{'name': 'Tag 0'}, {'name': 'Bench tag'}],
+                },
+                format='json',
+            ),
+            'recipe-update': lambda: self.client.patch(
+                self.detail_url,
+                {'tags': [{'name': 'Tag 1'}, {'name': 'Bench tag'}]},
+                format='json',
+            ),
+            'tags-list': lambda: self.client.get(reverse('recipe:tag-list')),
+            'ingredients-list': lambda: self.client.get(
+                reverse('recipe:ingredient-list'),
+            ),
+            'user-me': lambda: self.client.get(reverse('user:me')),
+            'user-token': lambda: self.client.post(
+                reverse('user:token'),
+                {'email': self.email, 'password': 'bench-password'},
+                format='json',
+            ),
+        }
+        ordered = {}
+        for name, call in endpoints.items():
+            ordered[name] = call
+            if name in self.CACHED_ENDPOINTS:
+                ordered[f'{name}-cached'] = call
+        return ordered
+
+    def _run_size(self, size):
+        self.email = f'bench-endpoints-{size}@example.com'
+        user = seed_recipes(self.email, size, self.options['nested'])
+        user.set_password('bench-password')
+        user.save(update_fields=['password'])
+        self.detail_url = reverse(
+            'recipe:recipe-detail',
+            args=[Recipe.objects.filter(user=user).order_by('id')[0].id],
+        )
+        self._login()
+
+        results = []
+        for name, call in self.endpoints().items():
+            if self.options['endpoint'] and (
+                    name not in self.options['endpoint']):
+                continue
+            if name in self.CACHED_ENDPOINTS:
+                cache = 'cold'
+            elif name.endswith('-cached'):
+                cache = 'warm'
+            else:
+                cache = None
+            result = {'size': size, 'endpoint': name, 'cache': cache}
+            result.update(self._measure(call, cache))
+            results.append(result)
+            self.log.write(
+                f'{size} recipes, {name}: p50 {result["p50_ms"]:.2f} ms, '
+                f'p95 {result["p95_ms"]:.2f} ms, '
+                f'p99 {result["p99_ms"]:.2f} ms, '
+                f'{result["queries"]:.1f} queries, '
+                f'SQL {result["sql_ms"]:.2f} ms, '
+                f'{result["alloc_kib"]:.0f} KiB allocated'
+            )
+        return results
+
+    def _login(self):
+        """Authenticate the client the way API clients do."""
+        self.client = APIClient()
+        res = self.client.post(
+            reverse('user:token'),
+            {'email': self.email, 'password': 'bench-password'},
+            format='json',
+        )
+        if res.status_code != 200:
+            raise CommandError(f'Login failed with {res.status_code}')
+        if settings.AUTH_TOKEN_MODE == 'signed':
+            auth = f'Bearer {res.data["access"]}'
+        else:
+            auth = f'Token {res.data["token"]}'
+        self.client.credentials(HTTP_AUTHORIZATION=auth)
+
+    def _measure(self, call, cache=None):
+        """Measure ``call``, with a 'cold' or 'warm' recipe cache if set."""
+        options = self.options
+
+        def prepare():
+            if cache == 'cold':
+                get_cache().clear()
+
+        for _ in range(options['warmup']):
+            prepare()
+            self._check(call())
+        if cache == 'warm':
+            # fill the cache even without warmup calls
+            self._check(call())
+
+        latencies = []
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            for _ in range(options['repeat']):
+                prepare()
+                started = time.perf_counter()
+                response = call()
+                latencies.append(time.perf_counter() - started)
+                self._check(response)
+
+        allocated = []
+        if options['alloc_repeat']:
+            tracemalloc.start()
+            try:
+                for _ in range(options['alloc_repeat']):
+                    prepare()
+                    tracemalloc.reset_peak()
+                    start, _ = tracemalloc.get_traced_memory()
+                    call()
+                    _, peak = tracemalloc.get_traced_memory()
+                    allocated.append(peak - start)
+            finally:
+                tracemalloc.stop()
+
+        repeat = max(options['repeat'], 1)
+        return {
+            'calls': options['repeat'],
+            'status': response.status_code if options['repeat'] else None,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'queries': counter.queries / repeat,
+            'savepoints': counter.savepoints / repeat,
+            'sql_ms': counter.seconds / repeat * 1000,
+            # peak memory above the starting point, per call
+            'alloc_kib': percentile(allocated, 50) / 1024,
+        }
+
+    def _check(self, response):
+        if response.status_code >= 400:
+            raise CommandError(
+                f'{response.wsgi_request.method} '
+                f'{response.wsgi_request.path} failed with '
+                f'{response.status_code}: {response.content[:200]!r}'
+            )
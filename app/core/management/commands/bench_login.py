@@ -0,0 +1,72 @@
+"""
+Django command to benchmark password verification throughput
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import (
+    check_password,
+    make_password,
+)
+from django.core.management.base import BaseCommand
+
+from core.benchmark import (
+    measure,
+    per_second,
+)
+from core.hashing import (
+    PoolSaturated,
+    get_hash_pool,
+)
+
+
+class Command(BaseCommand):
+    """Measure logins per second per core at the configured hasher cost."""
+    help = 'Benchmark password verification with the configured hasher.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=50)
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=32,
+            help='Simulated concurrent logins sent through the hash pool.',
+        )
+
+    def handle(self, *args, **options):
+        logins = options['logins']
+        encoded = make_password('bench-password')
+        self.stdout.write(f'Hash: {encoded.rsplit("$", 2)[0]}')
+
+        def verify_all():
+            for _ in range(logins):
+                check_password('bench-password', encoded)
+
+        wall, cpu = measure(verify_all, 1)
+        self.stdout.write(
+            f'single thread: {per_second(logins, cpu[0]):.1f} '
+            f'logins/s per core'
+        )
+
+        pool = get_hash_pool()
+        rejected = 0
+
+        def login():
+            try:
+                pool.run(check_password, 'bench-password', encoded)
+                return True
+            except PoolSaturated:
+                return False
+
+        def storm():
+            nonlocal rejected
+            with ThreadPoolExecutor(options['concurrency']) as clients:
+                results = list(clients.map(lambda _: login(), range(logins)))
+            rejected = results.count(False)
+
+        wall, cpu = measure(storm, 1)
+        served = logins - rejected
+        self.stdout.write(
+            f'hash pool: {per_second(served, wall[0]):.1f} logins/s with '
+            f'{pool.workers} workers, {rejected} rejected with 429'
+        )
+        self.stdout.write(str(pool.stats()))
@@ -0,0 +1,76 @@
+"""
+Django command to benchmark the API renderers and parsers
+"""
+import gzip
+import io
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.benchmark import (
+    measure,
+    per_second,
+    seed_recipes,
+)
+from core.models import Recipe
+from core.parsers import (
+    MessagePackParser,
+    ORJSONParser,
+)
+from core.renderers import (
+    MessagePackRenderer,
+    ORJSONRenderer,
+)
+from recipe.serializers import RecipeDetailSerializer
+
+FORMATS = [
+    ('json', JSONRenderer(), JSONParser()),
+    ('orjson', ORJSONRenderer(), ORJSONParser()),
+    ('msgpack', MessagePackRenderer(), MessagePackParser()),
+]
+
+
+class Command(BaseCommand):
+    """Encode and decode a recipe list page with each format."""
+    help = 'Benchmark API renderers and parsers on recipe payloads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100)
+        parser.add_argument('--nested', type=int, default=5)
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = seed_recipes(
+                'bench-renderers@example.com',
+                options['recipes'],
+                options['nested'],
+            )
+            recipes = Recipe.objects.filter(user=user).prefetch_related(
+                'tags', 'ingredients'
+            )
+            data = {
+                'next': None,
+                'previous': None,
+                'results': RecipeDetailSerializer(recipes, many=True).data,
+            }
+            # leave the database as it was
+            transaction.set_rollback(True)
+
+        repeat = options['repeat']
+        for name, renderer, parser in FORMATS:
+            body = renderer.render(data)
+            _, encode = measure(lambda: renderer.render(data), repeat)
+            _, decode = measure(
+                lambda: parser.parse(io.BytesIO(body), parser.media_type),
+                repeat,
+            )
+            self.stdout.write(
+                f'{name}: {len(body)} bytes, '
+                f'{len(gzip.compress(body))} gzipped, '
+                f'encode {per_second(1, min(encode)):.0f} pages/s, '
+                f'decode {per_second(1, min(decode)):.0f} pages/s'
+            )
@@ -0,0 +1,53 @@
+"""
+Django command to benchmark the recipe list serializers
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.benchmark import (
+    measure,
+    per_second,
+    seed_recipes,
+)
+from core.models import Recipe
+from recipe import fast
+from recipe.serializers import RecipeSerializer
+
+
+class Command(BaseCommand):
+    """Compare RecipeSerializer against the fast read path."""
+    help = 'Benchmark recipe list serialization in rows per CPU second.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=2000)
+        parser.add_argument('--nested', type=int, default=5)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = seed_recipes(
+                'bench-serializers@example.com',
+                options['recipes'],
+                options['nested'],
+            )
+            queryset = Recipe.objects.filter(user=user).order_by('-id')
+            fields = RecipeSerializer.Meta.fields
+
+            def model_path():
+                recipes = queryset.prefetch_related('tags', 'ingredients')
+                return RecipeSerializer(recipes, many=True).data
+
+            def fast_path():
+                rows = fast.recipe_values(queryset, fields)
+                return fast.serialize_recipes(rows, fields)
+
+            for name, func in [('model', model_path), ('fast', fast_path)]:
+                wall, cpu = measure(func, options['repeat'])
+                self.stdout.write(
+                    f'{name}: '
+                    f'{per_second(options["recipes"], min(cpu)):.0f} '
+                    f'rows/s per core, '
+                    f'{min(wall) * 1000:.1f} ms best wall time'
+                )
+            # leave the database as it was
+            transaction.set_rollback(True)
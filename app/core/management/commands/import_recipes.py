@@ -0,0 +1,184 @@
+"""
+Django command to bulk import recipes for a user from NDJSON or CSV
+"""
+import collections
+import contextlib
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import (
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core import importing
+from core.benchmark import per_second
+from core.models import (
+    Recipe,
+    RecipeImport,
+    Tag,
+)
+from recipe.cache import invalidate_user
+
+
+class Command(BaseCommand):
+    """Parse input batches in worker processes and COPY them in order.
+
+    Every batch is committed together with the import's checkpoint, so
+    running the same command again after an interruption resumes where
+    it stopped.
+    """
+    help = 'Import recipes for a user from an NDJSON or CSV file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Input file, or - for stdin.')
+        parser.add_argument(
+            '--user',
+            required=True,
+            help='Email of the user who will own the recipes.',
+        )
+        parser.add_argument(
+            '--format',
+            choices=['ndjson', 'csv'],
+            help='Input format, by default taken from the file extension.',
+        )
+        parser.add_argument(
+            '--name',
+            help='Checkpoint name, by default the absolute input path.',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Parser processes, 0 to parse in this process.',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Import the whole input again instead of resuming.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or (
+            'csv' if path.lower().endswith('.csv') else 'ndjson'
+        )
+        name = options['name']
+        if name is None:
+            if path == '-':
+                raise CommandError('--name is required when reading stdin')
+            name = os.path.abspath(path)
+        try:
+            user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No user with email {options["user"]}')
+
+        checkpoint, created = RecipeImport.objects.get_or_create(
+            user=user,
+            name=name,
+            defaults={'batch_size': options['batch_size']},
+        )
+        if options['restart'] and not created:
+            checkpoint.batch_size = options['batch_size']
+            checkpoint.batches = checkpoint.imported = checkpoint.failed = 0
+            checkpoint.completed = None
+            checkpoint.save()
+        elif checkpoint.completed:
+            self.stdout.write(
+                f'{name} was already imported, use --restart to import '
+                f'it again'
+            )
+            return
+        elif checkpoint.batches:
+            self.stdout.write(
+                f'Resuming after batch {checkpoint.batches} of '
+                f'{checkpoint.batch_size} records'
+            )
+
+        if path == '-':
+            stream = contextlib.nullcontext(sys.stdin)
+        else:
+            stream = open(path, newline='', encoding='utf-8')
+        if options['workers']:
+            # spawn, so workers do not inherit the database connection
+            pool = ProcessPoolExecutor(
+                options['workers'],
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        else:
+            pool = ThreadPoolExecutor(1)
+        with stream as lines, pool:
+            self._import(user, checkpoint, fmt, lines, pool, options)
+
+        checkpoint.completed = timezone.now()
+        checkpoint.save(update_fields=['completed', 'updated'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {checkpoint.imported} recipes, '
+            f'{checkpoint.failed} records failed'
+        ))
+
+    def _import(self, user, checkpoint, fmt, lines, pool, options):
+        limits = {
+            'title': Recipe._meta.get_field('title').max_length,
+            'link': Recipe._meta.get_field('link').max_length,
+            'name': Tag._meta.get_field('name').max_length,
+            'price_digits': Recipe._meta.get_field('price').max_digits,
+            'price_places': Recipe._meta.get_field('price').decimal_places,
+        }
+        batches = importing.read_batches(lines, fmt, checkpoint.batch_size)
+        # committed batches are read again but not parsed
+        for _ in range(checkpoint.batches):
+            next(batches, None)
+
+        # parse a few batches ahead while loading in input order
+        window = max(options['workers'], 1) * 2
+        pending = collections.deque()
+        started = time.perf_counter()
+        self._records = 0
+        for header, items in batches:
+            pending.append(pool.submit(
+                importing.parse_batch, fmt, header, items, limits,
+            ))
+            if len(pending) >= window:
+                self._load(user, checkpoint, pending.popleft(), started)
+        while pending:
+            self._load(user, checkpoint, pending.popleft(), started)
+
+    def _load(self, user, checkpoint, future, started):
+        """Load one parsed batch and advance the checkpoint with it."""
+        records, errors = future.result()
+        for line, message in errors:
+            self.stderr.write(f'line {line}: {message}')
+
+        with transaction.atomic():
+            if records:
+                with connection.cursor() as cursor:
+                    importing.load_batch(cursor, user.id, records)
+                invalidate_user(user.id)
+            RecipeImport.objects.filter(pk=checkpoint.pk).update(
+                batches=F('batches') + 1,
+                imported=F('imported') + len(records),
+                failed=F('failed') + len(errors),
+                updated=timezone.now(),
+            )
+        checkpoint.batches += 1
+        checkpoint.imported += len(records)
+        checkpoint.failed += len(errors)
+
+        self._records += len(records) + len(errors)
+        rate = per_second(self._records, time.perf_counter() - started)
+        self.stdout.write(
+            f'batch {checkpoint.batches}: {checkpoint.imported} imported, '
+            f'{checkpoint.failed} failed, {rate:.0f} records/s'
+        )
@@ -0,0 +1,69 @@
+"""
+Django command to delete expired auth tokens in batches
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from rest_framework.authtoken.models import Token
+
+from core.authentication import expired_token_cutoff
+from core.tokens import expired_revocations
+
+
+class Command(BaseCommand):
+    """Django command to purge expired tokens"""
+    help = 'Delete expired auth tokens in small batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Tokens deleted per transaction.',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0.0,
+            help='Seconds to pause between batches.',
+        )
+
+    def handle(self, *args, **options):
+        revoked = self.delete_in_batches(
+            expired_revocations(), 'expires', options,
+        )
+        self.stdout.write(f'Deleted {revoked} expired token revocations')
+        if not settings.AUTH_TOKEN_TTL:
+            self.stdout.write('Tokens never expire, nothing to purge')
+            return
+
+        total = self.delete_in_batches(
+            Token.objects.filter(created__lt=expired_token_cutoff()),
+            'created',
+            options,
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Deleted {total} expired tokens')
+        )
+
+    def delete_in_batches(self, queryset, order_by, options):
+        """Delete the rows of queryset, oldest first, and return how many."""
+        total = 0
+        while True:
+            # each batch is its own short transaction so locks are
+            # released before the next one starts
+            with transaction.atomic():
+                pks = list(
+                    queryset.order_by(order_by)
+                    .values_list('pk', flat=True)[:options['batch_size']]
+                )
+                if not pks:
+                    break
+                queryset.model.objects.filter(pk__in=pks).delete()
+            total += len(pks)
+            if options['sleep']:
+                time.sleep(options['sleep'])
+        return total
@@ -0,0 +1,219 @@
+"""
+Django command to seed a large synthetic dataset for scale testing
+"""
+import math
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+from django.db import connection, transaction
+
+from core.benchmark import per_second
+from core.importing import copy_rows
+
+ADJECTIVES = [
+    'Spicy', 'Smoky', 'Creamy', 'Crispy', 'Roasted', 'Grilled', 'Zesty',
+    'Sweet', 'Tangy', 'Herby', 'Garlicky', 'Rustic', 'Quick', 'Slow',
+]
+DISHES = [
+    'Curry', 'Soup', 'Stew', 'Salad', 'Pasta', 'Risotto', 'Tacos', 'Pie',
+    'Noodles', 'Bake', 'Stir Fry', 'Chili', 'Omelette', 'Flatbread',
+]
+WORDS = [
+    'chop', 'simmer', 'season', 'stir', 'serve', 'roast', 'whisk', 'fold',
+    'rest', 'slice', 'the', 'with', 'until', 'golden', 'tender', 'fresh',
+]
+
+
+def zipf_weights(count, exponent):
+    """Return cumulative weights favouring low ranks like real vocabularies."""
+    total = 0.0
+    weights = []
+    for rank in range(1, count + 1):
+        total += 1 / rank ** exponent
+        weights.append(total)
+    return weights
+
+
+class Command(BaseCommand):
+    """Generate users, recipes, tags and ingredients with COPY.
+
+    Every user gets their own random generator derived from ``--seed`` and
+    their index, so the same options always produce the same data.
+    Recipe counts follow a log-normal distribution around ``--recipes``,
+    plus ``--heavy-users`` users with ``--heavy-recipes`` each. Tags and
+    ingredients are picked with Zipf-like popularity.
+    """
+    help = 'Seed a deterministic large dataset of users and recipes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--recipes',
+            type=int,
+            default=200,
+            help='Median recipes per regular user.',
+        )
+        parser.add_argument(
+            '--spread',
+            type=float,
+            default=1.0,
+            help='Log-normal sigma of recipes per user, 0 for all equal.',
+        )
+        parser.add_argument('--heavy-users', type=int, default=1)
+        parser.add_argument('--heavy-recipes', type=int, default=100000)
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--ingredients', type=int, default=300)
+        parser.add_argument('--tags-per-recipe', type=int, default=3)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument(
+            '--zipf',
+            type=float,
+            default=1.1,
+            help='Popularity skew of tags and ingredients.',
+        )
+        parser.add_argument('--batch-size', type=int, default=20000)
+        parser.add_argument('--email-prefix', default='seed')
+        parser.add_argument('--password', default='seed-password')
+
+    def handle(self, *args, **options):
+        self.options = options
+        prefix = options['email_prefix']
+        if get_user_model().objects.filter(
+                email__startswith=f'{prefix}-').exists():
+            raise CommandError(
+                f'Users with the prefix {prefix!r} already exist, '
+                f'pick another --email-prefix'
+            )
+        # hashing once keeps seeding fast, every user shares the password
+        self.password = make_password(options['password'])
+        self.tag_weights = zipf_weights(options['tags'], options['zipf'])
+        self.ingredient_weights = zipf_weights(
+            options['ingredients'], options['zipf']
+        )
+
+        users = options['heavy_users'] + options['users']
+        self.rows = 0
+        started = time.perf_counter()
+        for index in range(users):
+            # one transaction per user keeps a failed run easy to clean up
+            with transaction.atomic():
+                self._seed_user(index)
+            self.stdout.write(
+                f'user {index + 1}/{users}: {self.rows} rows, '
+                f'{per_second(self.rows, time.perf_counter() - started):.0f}'
+                f' rows/s'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {users} users and {self.rows} rows'
+        ))
+
+    def _recipe_count(self, index, rng):
+        options = self.options
+        if index < options['heavy_users']:
+            return options['heavy_recipes']
+        if not options['spread']:
+            return options['recipes']
+        count = rng.lognormvariate(
+            math.log(max(options['recipes'], 1)), options['spread'],
+        )
+        return max(int(count), 0)
+
+    def _seed_user(self, index):
+        options = self.options
+        rng = random.Random(options['seed'] * 1000003 + index)
+        user = get_user_model().objects.create(
+            email=f'{options["email_prefix"]}-{index}@example.com',
+            name=f'Seed user {index}',
+            password=self.password,
+        )
+        with connection.cursor() as cursor:
+            tag_ids = self._seed_names(
+                cursor, 'core_tag', 'Tag', user.id, options['tags'],
+            )
+            ingredient_ids = self._seed_names(
+                cursor, 'core_ingredient', 'Ingredient', user.id,
+                options['ingredients'],
+            )
+            remaining = self._recipe_count(index, rng)
+            while remaining:
+                size = min(remaining, options['batch_size'])
+                self._seed_recipes(
+                    cursor, rng, user.id, size, tag_ids, ingredient_ids,
+                )
+                remaining -= size
+
+    def _next_ids(self, cursor, table, count):
+        """Reserve ``count`` ids from the table's sequence."""
+        cursor.execute(
+            'SELECT nextval(pg_get_serial_sequence(%s, %s)) '
+            'FROM generate_series(1, %s)',
+            [table, 'id', count],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+    def _seed_names(self, cursor, table, label, user_id, count):
+        ids = self._next_ids(cursor, table, count)
+        copy_rows(
+            cursor, table, ('id', 'user_id', 'name'),
+            ((id, user_id, f'{label} {rank}')
+             for rank, id in enumerate(ids, 1)),
+        )
+        self.rows += count
+        return ids
+
+    def _pick(self, rng, ids, weights, mean):
+        """Return distinct ids, about ``mean`` of them, by popularity."""
+        if not ids or mean <= 0:
+            return set()
+        count = min(rng.randint(0, 2 * mean), len(ids))
+        return set(rng.choices(ids, cum_weights=weights, k=count))
+
+    def _seed_recipes(self, cursor, rng, user_id, count, tag_ids,
+                      ingredient_ids):
+        options = self.options
+        ids = self._next_ids(cursor, 'core_recipe', count)
+        recipes = []
+        tags = []
+        ingredients = []
+        for recipe_id in ids:
+            recipes.append((
+                recipe_id,
+                user_id,
+                f'{rng.choice(ADJECTIVES)} {rng.choice(DISHES)}',
+                rng.randint(5, 240),
+                f'{rng.randint(100, 9999) / 100:.2f}',
+                '' if rng.random() < 0.7 else
+                f'https://example.com/recipes/{recipe_id}',
+                ' '.join(rng.choices(WORDS, k=rng.randint(0, 40))),
+            ))
+            tags.extend(
+                (recipe_id, tag_id) for tag_id in self._pick(
+                    rng, tag_ids, self.tag_weights,
+                    options['tags_per_recipe'],
+                )
+            )
+            ingredients.extend(
+                (recipe_id, ingredient_id) for ingredient_id in self._pick(
+                    rng, ingredient_ids, self.ingredient_weights,
+                    options['ingredients_per_recipe'],
+                )
+            )
+        copy_rows(
+            cursor, 'core_recipe',
+            ('id', 'user_id', 'title', 'time_minutes', 'price', 'link',
+             'description'),
+            recipes,
+        )
+        copy_rows(cursor, 'core_recipe_tags', ('recipe_id', 'tag_id'), tags)
+        copy_rows(
+            cursor, 'core_recipe_ingredients',
+            ('recipe_id', 'ingredient_id'), ingredients,
+        )
+        self.rows += len(recipes) + len(tags) + len(ingredients)
@@ -0,0 +1,48 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_recipe_relation_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='core_recipe_search_idx'),
+        ),
+        migrations.RunSQL(
+            sql="""
+            CREATE FUNCTION core_recipe_search_vector_update()
+            RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector :=
+                    setweight(to_tsvector(
+                        'pg_catalog.english', coalesce(NEW.title, '')
+                    ), 'A') ||
+                    setweight(to_tsvector(
+                        'pg_catalog.english', coalesce(NEW.description, '')
+                    ), 'B');
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql;
+
+            CREATE TRIGGER core_recipe_search_vector_trigger
+            BEFORE INSERT OR UPDATE OF title, description
+            ON core_recipe
+            FOR EACH ROW EXECUTE FUNCTION core_recipe_search_vector_update();
+            """,
+            reverse_sql="""
+            DROP TRIGGER core_recipe_search_vector_trigger ON core_recipe;
+            DROP FUNCTION core_recipe_search_vector_update();
+            """,
+        ),
+    ]
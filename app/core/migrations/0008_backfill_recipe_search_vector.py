@@ -0,0 +1,41 @@
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+BATCH_SIZE = 5000
+
+
+def backfill_search_vector(apps, schema_editor):
+    """Populate search_vector for existing recipes in id ordered batches."""
+    Recipe = apps.get_model('core', 'Recipe')
+    vector = (
+        SearchVector('title', weight='A', config='english') +
+        SearchVector('description', weight='B', config='english')
+    )
+    last_id = 0
+    while True:
+        ids = list(
+            Recipe.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .values_list('id', flat=True)[:BATCH_SIZE]
+        )
+        if not ids:
+            break
+        Recipe.objects.filter(id__in=ids).update(search_vector=vector)
+        last_id = ids[-1]
+
+
+class Migration(migrations.Migration):
+    # commit each batch on its own so the backfill never holds row locks
+    # on the whole table
+    atomic = False
+
+    dependencies = [
+        ('core', '0007_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            backfill_search_vector,
+            migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,65 @@
+from django.db import migrations
+
+
+def merge_duplicates_sql(table, through, column):
+    """Repoint links from duplicate rows to the oldest row and delete them.
+
+    Rows are duplicates when they share a user and a case-insensitive name.
+    """
+    dupes = f"""
+        SELECT id, keep_id FROM (
+            SELECT id, min(id) OVER (
+                PARTITION BY user_id, lower(name)
+            ) AS keep_id
+            FROM {table}
+        ) ranked
+        WHERE id <> keep_id
+    """
+    return [
+        f"""
+        INSERT INTO {through} (recipe_id, {column})
+        SELECT link.recipe_id, dupes.keep_id
+        FROM {through} link JOIN ({dupes}) dupes ON link.{column} = dupes.id
+        ON CONFLICT (recipe_id, {column}) DO NOTHING;
+        """,
+        f"""
+        DELETE FROM {through} link USING ({dupes}) dupes
+        WHERE link.{column} = dupes.id;
+        """,
+        f"""
+        DELETE FROM {table} item USING ({dupes}) dupes
+        WHERE item.id = dupes.id;
+        """,
+    ]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_backfill_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=merge_duplicates_sql('core_tag', 'core_recipe_tags', 'tag_id'),
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(
+            sql=merge_duplicates_sql(
+                'core_ingredient', 'core_recipe_ingredients', 'ingredient_id'
+            ),
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        # Django 3.2 cannot express unique constraints on expressions, so
+        # the case-normalized indexes are managed here
+        migrations.RunSQL(
+            sql='CREATE UNIQUE INDEX core_tag_user_name_uniq '
+                'ON core_tag (user_id, lower(name));',
+            reverse_sql='DROP INDEX core_tag_user_name_uniq;',
+        ),
+        migrations.RunSQL(
+            sql='CREATE UNIQUE INDEX core_ingredient_user_name_uniq '
+                'ON core_ingredient (user_id, lower(name));',
+            reverse_sql='DROP INDEX core_ingredient_user_name_uniq;',
+        ),
+    ]
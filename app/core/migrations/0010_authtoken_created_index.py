@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_unique_tag_ingredient_names'),
+        ('authtoken', '0002_auto_20160226_1747'),
+    ]
+
+    # Lets purge_expired_tokens find expired tokens without scanning the
+    # whole table for every batch. The index lives on DRF's authtoken_token
+    # table, so this names the authtoken migration it was written against
+    # as a dependency. authtoken's own migrations cannot see the index; one
+    # that rebuilt the table would drop it and it would need adding again.
+    operations = [
+        migrations.RunSQL(
+            sql='CREATE INDEX core_authtoken_created_idx '
+                'ON authtoken_token (created);',
+            reverse_sql='DROP INDEX core_authtoken_created_idx;',
+        ),
+    ]
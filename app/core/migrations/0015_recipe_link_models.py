@@ -0,0 +1,77 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_revokedaccesstoken'),
+    ]
+
+    # The link tables and the indexes from 0006 already exist, so only
+    # the state changes; the indexes are renamed to fit Django's 30
+    # character limit on declared index names.
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    sql='ALTER INDEX core_recipe_tags_tag_recipe_idx '
+                        'RENAME TO core_recipetag_tag_recipe_idx;',
+                    reverse_sql='ALTER INDEX core_recipetag_tag_recipe_idx '
+                                'RENAME TO core_recipe_tags_tag_recipe_idx;',
+                ),
+                migrations.RunSQL(
+                    sql='ALTER INDEX '
+                        'core_recipe_ingredients_ingredient_recipe_idx '
+                        'RENAME TO core_recipeing_ingr_recipe_idx;',
+                    reverse_sql='ALTER INDEX core_recipeing_ingr_recipe_idx '
+                                'RENAME TO '
+                                'core_recipe_ingredients_ingredient_recipe_idx;',
+                ),
+            ],
+            state_operations=[
+                migrations.CreateModel(
+                    name='RecipeTag',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.recipe')),
+                        ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.tag')),
+                    ],
+                    options={
+                        'db_table': 'core_recipe_tags',
+                        'unique_together': {('recipe', 'tag')},
+                    },
+                ),
+                migrations.CreateModel(
+                    name='RecipeIngredient',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.ingredient')),
+                        ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.recipe')),
+                    ],
+                    options={
+                        'db_table': 'core_recipe_ingredients',
+                        'unique_together': {('recipe', 'ingredient')},
+                    },
+                ),
+                migrations.AddIndex(
+                    model_name='recipetag',
+                    index=models.Index(fields=['tag', 'recipe'], name='core_recipetag_tag_recipe_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='recipeingredient',
+                    index=models.Index(fields=['ingredient', 'recipe'], name='core_recipeing_ingr_recipe_idx'),
+                ),
+                migrations.AlterField(
+                    model_name='recipe',
+                    name='tags',
+                    field=models.ManyToManyField(through='core.RecipeTag', to='core.Tag'),
+                ),
+                migrations.AlterField(
+                    model_name='recipe',
+                    name='ingredients',
+                    field=models.ManyToManyField(through='core.RecipeIngredient', to='core.Ingredient'),
+                ),
+            ],
+        ),
+    ]
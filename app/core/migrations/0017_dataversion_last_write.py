@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_dataversion_user_constraint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataversion',
+            name='last_write',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
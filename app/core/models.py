@@ -3,7 +3,14 @@ Database models
 """
 
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Lower
+
+from core.hashing import set_password
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
@@ -19,8 +26,8 @@ class UserManager(BaseUserManager):
         if not email:
             raise ValueError('User must have an email address.')
         user = self.model(email=self.normalize_email(email), **extra_fields)
-        # set encrypted password
-        user.set_password(password)
+        # set encrypted password, hashing on the bounded hash pool
+        set_password(user, password)
         # adding user to add to databases (optional)
         user.save(using=self._db)
 
@@ -58,14 +65,57 @@ class Recipe(models.Model):
     time_minutes = models.IntegerField()
     price = models.DecimalField(max_digits=5, decimal_places=2)
     link = models.CharField(max_length=255, blank=True)
-    tags = models.ManyToManyField('Tag')
-    ingredients = models.ManyToManyField('Ingredient')
+    tags = models.ManyToManyField('Tag', through='RecipeTag')
+    ingredients = models.ManyToManyField(
+        'Ingredient',
+        through='RecipeIngredient',
+    )
+    # maintained by a database trigger from title and description
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='core_recipe_search_idx'),
+        ]
 
     def __str__(self):
         return self.title
-    
-class Tag(models.Model):
-    """Tag for filtering recipes"""
+
+
+class UniqueNameModel(models.Model):
+    """Model whose names are unique per user ignoring case.
+
+    The database enforces this with a unique index on
+    ``(user_id, lower(name))`` added in migration 0009. Django 3.2 cannot
+    declare expression constraints, so ``validate_unique`` repeats the
+    check for model forms such as the admin.
+    """
+
+    class Meta:
+        abstract = True
+
+    def validate_unique(self, exclude=None):
+        super().validate_unique(exclude)
+        if exclude and ('name' in exclude or 'user' in exclude):
+            return
+        clash = type(self)._default_manager.annotate(
+            name_key=Lower('name'),
+        ).filter(
+            user_id=self.user_id,
+            name_key=Lower(Value(self.name)),
+        ).exclude(pk=self.pk)
+        if clash.exists():
+            raise ValidationError({
+                'name': 'An item with this name already exists.',
+            })
+
+
+class Tag(UniqueNameModel):
+    """Tag for filtering recipes
+
+    Names are unique per user ignoring case, enforced by the
+    ``core_tag_user_name_uniq`` index on ``(user_id, lower(name))``.
+    """
     name = models.CharField(max_length=255)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -75,8 +125,12 @@ class Tag(models.Model):
     def __str__(self):
         return self.name
     
-class Ingredient(models.Model):
-    """Ingredient for recipes"""
+class Ingredient(UniqueNameModel):
+    """Ingredient for recipes
+
+    Names are unique per user ignoring case, enforced by the
+    ``core_ingredient_user_name_uniq`` index on ``(user_id, lower(name))``.
+    """
     name = models.CharField(max_length=255)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -84,4 +138,128 @@ class Ingredient(models.Model):
     )
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+
+class RecipeTag(models.Model):
+    """Link between a recipe and a tag.
+
+    Declared on the table Django created for the relation, so the
+    ``(tag, recipe)`` index used by tag filters is part of the model.
+    """
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE)
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE)
+
+    class Meta:
+        db_table = 'core_recipe_tags'
+        unique_together = [('recipe', 'tag')]
+        indexes = [
+            models.Index(
+                fields=['tag', 'recipe'],
+                name='core_recipetag_tag_recipe_idx',
+            ),
+        ]
+
+
+class RecipeIngredient(models.Model):
+    """Link between a recipe and an ingredient."""
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE)
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE)
+
+    class Meta:
+        db_table = 'core_recipe_ingredients'
+        unique_together = [('recipe', 'ingredient')]
+        indexes = [
+            models.Index(
+                fields=['ingredient', 'recipe'],
+                name='core_recipeing_ingr_recipe_idx',
+            ),
+        ]
+
+
+class RefreshToken(models.Model):
+    """Long lived token used to obtain new signed access tokens.
+
+    Only a SHA-256 digest of the token is stored.
+    """
+    key = models.CharField(max_length=64, unique=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    created = models.DateTimeField(auto_now_add=True)
+    expires = models.DateTimeField()
+
+    def __str__(self):
+        return f'Refresh token for {self.user_id}'
+
+
+class RevokedAccessToken(models.Model):
+    """Signed access tokens rejected before they expire.
+
+    A row with a ``jti`` revokes that one token. A row without one
+    revokes every token issued to the user up to ``issued_before``, a
+    unix timestamp. Rows are only needed until ``expires``.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    jti = models.CharField(max_length=32, unique=True, null=True)
+    issued_before = models.BigIntegerField(null=True)
+    expires = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f'Revoked access token for {self.user_id}'
+
+
+class RecipeImport(models.Model):
+    """Checkpoint of a bulk recipe import so it can resume.
+
+    Each input batch is loaded in the same transaction that bumps
+    ``batches``, so after an interruption the import carries on from
+    the first batch that was not committed.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    name = models.CharField(max_length=255)
+    batch_size = models.PositiveIntegerField()
+    batches = models.PositiveIntegerField(default=0)
+    imported = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    completed = models.DateTimeField(null=True, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='core_recipeimport_user_name_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class DataVersion(models.Model):
+    """Version of a user's recipe data, bumped by every write to it.
+
+    Kept in the database and bumped inside the writing transaction, so
+    every process sees a new version exactly when the write commits.
+    ``last_write`` is when the user last wrote through the API, which
+    keeps their reads on the primary for a while when replicas are used.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+    )
+    version = models.BigIntegerField(default=0)
+    last_write = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'Data version {self.version} of {self.user_id}'
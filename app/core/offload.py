@@ -0,0 +1,230 @@
+"""
+Run synchronous API views on a bounded thread pool under ASGI.
+
+Django 3.2 wraps every sync view in ``sync_to_async(thread_sensitive=True)``
+under ASGI, which runs them all one at a time on a single shared thread.
+The views here only share state through the database and thread-safe
+caches, so ``offload`` wraps them in coroutines that run on a pool of
+``ASGI_THREADS`` threads instead, each holding its own DB connection.
+Requests beyond ``ASGI_QUEUE`` waiting calls get a 503 from the event loop
+without taking a thread.
+
+Django 3.2 also iterates streaming responses on the event loop itself,
+where generators that query the database are not allowed to run.
+``OffloadingASGIHandler`` iterates them on a pool thread instead and
+hands the parts to the event loop through a small queue.
+"""
+
+import asyncio
+import functools
+import threading
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.db import close_old_connections
+from django.http import JsonResponse
+from django.urls import URLPattern, URLResolver, include
+
+from core.executor import BoundedExecutor
+
+
+class ViewThreadPool(BoundedExecutor):
+    """Run views on at most ``workers`` threads with a bounded backlog."""
+
+    def __init__(self, workers, max_queue):
+        super().__init__(
+            workers,
+            max_queue,
+            thread_name_prefix='asgi-view',
+        )
+
+    async def run(self, func, *args, **kwargs):
+        """Run ``func`` on the pool in a slot from ``try_acquire``."""
+        def task():
+            # each pool thread owns a connection, so apply the same
+            # CONN_MAX_AGE handling that request signals do under WSGI
+            close_old_connections()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                close_old_connections()
+
+        return await asyncio.wrap_future(self.submit(task))
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_view_pool():
+    """Return the process wide view pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ViewThreadPool(
+                    settings.ASGI_THREADS,
+                    settings.ASGI_QUEUE,
+                )
+    return _pool
+
+
+def _render(view, request, *args, **kwargs):
+    response = view(request, *args, **kwargs)
+    # render on the pool thread too, otherwise Django hops back to the
+    # shared sync thread to do it
+    if hasattr(response, 'render') and callable(response.render):
+        response.render()
+    return response
+
+
+def _busy():
+    response = JsonResponse(
+        {'detail': 'Server busy, please try again.'},
+        status=503,
+    )
+    response['Retry-After'] = '1'
+    return response
+
+
+def offload(view):
+    """Return an async version of ``view`` that runs on the view pool."""
+    if asyncio.iscoroutinefunction(view):
+        return view
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        pool = get_view_pool()
+        if not pool.try_acquire():
+            return _busy()
+        return await pool.run(_render, view, request, *args, **kwargs)
+
+    return wrapper
+
+
+_DONE = object()
+
+
+class OffloadingASGIHandler(ASGIHandler):
+    """ASGIHandler that iterates streaming responses on the view pool."""
+    # parts buffered between the pool thread and the event loop
+    stream_buffer = 8
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+        pool = get_view_pool()
+        if not pool.try_acquire():
+            await sync_to_async(response.close, thread_sensitive=True)()
+            return await super().send_response(_busy(), send)
+
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(self.stream_buffer)
+        stopped = asyncio.Event()
+
+        async def put(part):
+            """Queue ``part`` unless the client goes away first."""
+            if stopped.is_set():
+                return False
+            putter = asyncio.ensure_future(queue.put(part))
+            waiter = asyncio.ensure_future(stopped.wait())
+            await asyncio.wait(
+                {putter, waiter},
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            waiter.cancel()
+            if putter.done():
+                return True
+            putter.cancel()
+            return False
+
+        def produce():
+            # the generator and its DB connection live on this thread, so
+            # it is closed here too, which also returns the connection
+            try:
+                for part in response:
+                    if not asyncio.run_coroutine_threadsafe(
+                        put(part), loop
+                    ).result():
+                        break
+            finally:
+                response.close()
+                asyncio.run_coroutine_threadsafe(
+                    put(_DONE), loop
+                ).result()
+
+        producer = asyncio.ensure_future(pool.run(produce))
+        try:
+            await send(self._start_message(response))
+            while True:
+                part = await queue.get()
+                if part is _DONE:
+                    break
+                for chunk, _ in self.chunk_bytes(part):
+                    await send({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+            await send({'type': 'http.response.body'})
+        finally:
+            # a producer waiting on a full queue gives up once stopped is
+            # set, so it closes the response and finishes without a reader
+            stopped.set()
+            await producer
+
+    def _start_message(self, response):
+        """Return the ``http.response.start`` message Django would send."""
+        headers = []
+        for header, value in response.items():
+            if isinstance(header, str):
+                header = header.encode('ascii')
+            if isinstance(value, str):
+                value = value.encode('latin1')
+            headers.append((bytes(header), bytes(value)))
+        for cookie in response.cookies.values():
+            headers.append((
+                b'Set-Cookie',
+                cookie.output(header='').encode('ascii').strip(),
+            ))
+        return {
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': headers,
+        }
+
+
+def _offload_patterns(patterns):
+    """Return copies of ``patterns`` with every view offloaded."""
+    offloaded = []
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            pattern = URLResolver(
+                pattern.pattern,
+                _offload_patterns(pattern.url_patterns),
+                pattern.default_kwargs,
+                pattern.app_name,
+                pattern.namespace,
+            )
+        elif isinstance(pattern, URLPattern):
+            pattern = URLPattern(
+                pattern.pattern,
+                offload(pattern.callback),
+                pattern.default_args,
+                pattern.name,
+            )
+        offloaded.append(pattern)
+    return offloaded
+
+
+def offload_include(arg, namespace=None):
+    """``include`` that offloads every view of the included URLconf.
+
+    The included patterns are copied rather than changed, so the URLconf
+    module itself keeps its plain sync views.
+    """
+    urlconf_module, app_name, namespace = include(arg, namespace)
+    patterns = getattr(urlconf_module, 'urlpatterns', urlconf_module)
+    return _offload_patterns(patterns), app_name, namespace
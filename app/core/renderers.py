@@ -0,0 +1,75 @@
+"""
+Renderers for the REST API.
+"""
+
+from decimal import Decimal
+
+import msgpack
+import orjson
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_encoder = JSONEncoder()
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer producing the same bytes with orjson.
+
+    Types orjson does not handle natively, including Decimal and
+    datetimes, go through DRF's encoder so they come out exactly as
+    before. Floats print in orjson's shortest form, which only differs
+    from ``repr`` in exponent notation (``1e-7`` rather than ``1e-07``).
+    Indented or ASCII-only output and anything orjson rejects, like
+    integers beyond 64 bits, fall back to the stdlib renderer.
+    """
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (self.ensure_ascii or not self.compact or
+                self.get_indent(accepted_media_type, renderer_context or {})):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        try:
+            ret = orjson.dumps(
+                data, default=_encoder.default, option=self.options
+            )
+        except orjson.JSONEncodeError:
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        # escape line and paragraph separators like JSONRenderer does, as
+        # they are not valid in JavaScript strings
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028')
+            ret = ret.replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+def _msgpack_default(obj):
+    # keep Decimal exact, JSON renders it as a float
+    if isinstance(obj, Decimal):
+        return str(obj)
+    return _encoder.default(obj)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Renderer for ``application/msgpack``.
+
+    Values msgpack has no type for are converted like in JSON, except
+    Decimal which becomes a string so no precision is lost.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(
+            data, default=_msgpack_default, use_bin_type=True
+        )
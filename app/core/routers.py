@@ -0,0 +1,83 @@
+"""
+Database router that sends safe API reads to read replicas.
+
+Only views using ``ReplicaReadMixin`` read from a replica, and only for
+safe methods once the request is authenticated, so authentication and
+anything outside those views keeps using the primary. A user who has
+just written is pinned to the primary for ``REPLICA_STICKY_SECONDS`` so
+they always read their own writes despite replication lag. The time of
+their last write is kept with their data version on the primary, so the
+pin holds whichever process serves the next request and whether or not
+the client keeps cookies. That row is read anyway for ETags, so checking
+the pin costs no extra query on those views.
+"""
+
+import contextvars
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from rest_framework.permissions import SAFE_METHODS
+
+from recipe.cache import record_write, request_last_write
+
+_read_from_replica = contextvars.ContextVar(
+    'read_from_replica',
+    default=False,
+)
+
+
+def pinned_to_primary(request):
+    """Return whether the requesting user wrote within the sticky window."""
+    last_write = request_last_write(request)
+    return last_write is not None and (
+        timezone.now() - last_write <
+        timedelta(seconds=settings.REPLICA_STICKY_SECONDS)
+    )
+
+
+class ReplicaRouter:
+    """Route reads flagged by ``ReplicaReadMixin`` to a replica."""
+
+    def db_for_read(self, model, **hints):
+        if settings.DATABASE_REPLICAS and _read_from_replica.get():
+            return random.choice(settings.DATABASE_REPLICAS)
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaReadMixin:
+    """Read from a replica on safe requests by users not pinned."""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (request.method in SAFE_METHODS and
+                settings.DATABASE_REPLICAS and
+                not pinned_to_primary(request)):
+            self._replica_token = _read_from_replica.set(True)
+
+    def dispatch(self, request, *args, **kwargs):
+        self._replica_token = None
+        try:
+            response = super().dispatch(request, *args, **kwargs)
+        finally:
+            if self._replica_token is not None:
+                _read_from_replica.reset(self._replica_token)
+        if (request.method not in SAFE_METHODS and
+                settings.DATABASE_REPLICAS and
+                response.status_code < 400 and
+                self.request.user.is_authenticated):
+            record_write(self.request.user.pk)
+        return response
@@ -0,0 +1,32 @@
+"""
+Signal handlers for the core app.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+)
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from core.authentication import token_cache
+from core.tokens import revoke_user_tokens
+
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance, **kwargs):
+    """Stop authenticating with a token as soon as it is deleted."""
+    token_cache.delete(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def evict_changed_user(sender, instance, **kwargs):
+    """Drop cached copies of a user that was changed or deactivated."""
+    token_cache.evict_user(instance.pk)
+    if not instance.is_active and kwargs.get('signal') is post_save:
+        # keep the tokens revoked should the user be reactivated; deleted
+        # users are rejected by the user lookup itself
+        revoke_user_tokens(instance.pk)
@@ -0,0 +1,136 @@
+"""
+Tests for the cached token authentication.
+"""
+
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import (
+    TokenCache,
+    token_cache,
+)
+
+ME_URL = reverse('user:me')
+
+
+class TokenCacheTests(TestCase):
+    """Test the in-process token cache."""
+
+    def test_least_recently_used_entry_evicted(self):
+        """Test the cache drops the oldest entry when full."""
+        cache = TokenCache(max_size=2)
+        cache.set('a', (None, None), 60)
+        cache.set('b', (None, None), 60)
+        cache.get('a')
+
+        cache.set('c', (None, None), 60)
+
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('c'))
+
+    def test_expired_entry_ignored(self):
+        """Test entries are not returned after their TTL."""
+        cache = TokenCache(max_size=2)
+        cache.set('a', (None, None), -1)
+
+        self.assertIsNone(cache.get('a'))
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test authenticating API requests with cached tokens."""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+            name='Test Name',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_lookup_cached(self):
+        """Test only the first request looks the token up."""
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_invalid_token_cached_briefly(self):
+        """Test a rejected token is not looked up again straight away."""
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_rejected(self):
+        """Test deleting a token invalidates the cached entry."""
+        self.client.get(ME_URL)
+
+        self.token.delete()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test deactivating a user invalidates the cached entry."""
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_user_update_refreshes_cached_user(self):
+        """Test a profile update is visible on the next request."""
+        self.client.get(ME_URL)
+
+        self.client.patch(ME_URL, {'name': 'Updated Name'})
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'Updated Name')
+
+    def test_expired_token_rejected(self):
+        """Test a token older than its lifetime is rejected."""
+        Token.objects.filter(key=self.token.key).update(
+            created=timezone.now() - timedelta(seconds=120),
+        )
+
+        with self.settings(AUTH_TOKEN_TTL=60):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cached_token_expires(self):
+        """Test a cached token is rejected once it expires."""
+        self.client.get(ME_URL)
+
+        with self.settings(AUTH_TOKEN_TTL=1):
+            with patch(
+                'core.authentication.timezone.now',
+                return_value=timezone.now() + timedelta(seconds=5),
+            ):
+                with self.assertNumQueries(0):
+                    res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
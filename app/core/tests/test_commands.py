@@ -2,13 +2,35 @@
 Test custom Django management commands
 """
 
+import io
+import json
+import os
+import tempfile
+from datetime import timedelta
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2Error
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import models
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+)
+from django.utils import timezone
+
+from rest_framework.authtoken.models import Token
+
+from core.models import (
+    Recipe,
+    RecipeImport,
+    RevokedAccessToken,
+    Tag,
+)
 
 
 # added first to the function argument
@@ -34,4 +56,333 @@ class CommandsClass(SimpleTestCase):
         call_command('wait_for_db')
 
         self.assertEqual(patched_check.call_count, 6)
-        patched_check.assert_called_with(databases=['default'])
\ No newline at end of file
+        patched_check.assert_called_with(databases=['default'])
+
+
+class PurgeExpiredTokensTests(TestCase):
+    """Test the purge_expired_tokens command"""
+
+    def test_purge_expired_tokens(self):
+        """Test only tokens past their lifetime are deleted"""
+        fresh = None
+        for i in range(4):
+            user = get_user_model().objects.create_user(
+                email=f'user{i}@example.com',
+            )
+            token = Token.objects.create(user=user)
+            if i == 0:
+                fresh = token
+            else:
+                Token.objects.filter(key=token.key).update(
+                    created=timezone.now() - timedelta(days=365),
+                )
+
+        with self.settings(AUTH_TOKEN_TTL=60):
+            call_command('purge_expired_tokens', batch_size=2)
+
+        self.assertEqual(list(Token.objects.all()), [fresh])
+
+    def test_purge_skipped_without_expiry(self):
+        """Test nothing is deleted when tokens never expire"""
+        user = get_user_model().objects.create_user(email='u@example.com')
+        Token.objects.create(user=user)
+
+        with self.settings(AUTH_TOKEN_TTL=0):
+            call_command('purge_expired_tokens')
+
+        self.assertEqual(Token.objects.count(), 1)
+
+    def test_purge_expired_revocations(self):
+        """Test revocations of tokens that have expired are deleted"""
+        user = get_user_model().objects.create_user(email='u@example.com')
+        for jti, days in (('old1', -2), ('old2', -1), ('new', 1)):
+            RevokedAccessToken.objects.create(
+                user=user,
+                jti=jti,
+                expires=timezone.now() + timedelta(days=days),
+            )
+
+        out = io.StringIO()
+        call_command('purge_expired_tokens', batch_size=1, stdout=out)
+
+        self.assertIn('Deleted 2 expired token revocations', out.getvalue())
+
+        self.assertEqual(
+            list(RevokedAccessToken.objects.values_list('jti', flat=True)),
+            ['new'],
+        )
+
+
+class ImportRecipesTests(TestCase):
+    """Test the import_recipes command"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+        )
+
+    def _write(self, suffix, content):
+        handle, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(handle, 'w') as file:
+            file.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def _ndjson(self, count):
+        return ''.join(
+            json.dumps({
+                'title': f'Recipe {i}',
+                'time_minutes': 10,
+                'price': '2.50',
+                'tags': ['Dinner', 'dinner'],
+                'ingredients': [f'Ingredient {i}'],
+            }) + '\n'
+            for i in range(count)
+        )
+
+    def _import(self, path, **options):
+        options.setdefault('workers', 0)
+        call_command(
+            'import_recipes', path, user='user@example.com',
+            stdout=io.StringIO(), stderr=io.StringIO(), **options
+        )
+
+    def test_import_ndjson(self):
+        """Test recipes, tags and ingredients are merged from NDJSON"""
+        Tag.objects.create(user=self.user, name='DINNER')
+        path = self._write('.ndjson', self._ndjson(5))
+
+        self._import(path, batch_size=2)
+
+        recipes = Recipe.objects.filter(user=self.user).order_by('id')
+        self.assertEqual(
+            [recipe.title for recipe in recipes],
+            [f'Recipe {i}' for i in range(5)],
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(recipes[0].tags.get().name, 'DINNER')
+        self.assertEqual(recipes[4].ingredients.get().name, 'Ingredient 4')
+        checkpoint = RecipeImport.objects.get(user=self.user)
+        self.assertEqual(checkpoint.batches, 3)
+        self.assertIsNotNone(checkpoint.completed)
+
+    def test_import_csv_reports_bad_rows(self):
+        """Test invalid CSV rows are skipped and reported"""
+        path = self._write('.csv', (
+            'title,time_minutes,price,tags\n'
+            'Soup,5,1.25,Dinner|Quick\n'
+            'Broken,soon,1.00,\n'
+            ',5,1.00,\n'
+        ))
+        stderr = io.StringIO()
+
+        call_command(
+            'import_recipes', path, user='user@example.com', workers=0,
+            stdout=io.StringIO(), stderr=stderr,
+        )
+
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(str(recipe.price), '1.25')
+        self.assertEqual(recipe.description, '')
+        self.assertEqual(recipe.tags.count(), 2)
+        self.assertIn('line 3: time_minutes', stderr.getvalue())
+        self.assertIn('line 4: title is required', stderr.getvalue())
+        self.assertEqual(RecipeImport.objects.get().failed, 2)
+
+    def test_import_rejects_non_integer_time(self):
+        """Test fractional and boolean time_minutes are row errors"""
+        rows = [
+            {'title': title, 'time_minutes': time, 'price': '1.00'}
+            for title, time in (
+                ('Float', 12.9), ('String', '12.9'), ('Bool', True),
+                ('Whole', 12.0), ('Text', '7'),
+            )
+        ]
+        path = self._write('.ndjson', ''.join(
+            json.dumps(row) + '\n' for row in rows
+        ))
+        stderr = io.StringIO()
+
+        call_command(
+            'import_recipes', path, user='user@example.com', workers=0,
+            stdout=io.StringIO(), stderr=stderr,
+        )
+
+        self.assertEqual(
+            sorted(Recipe.objects.values_list('title', 'time_minutes')),
+            [('Text', 7), ('Whole', 12)],
+        )
+        for line in (1, 2, 3):
+            self.assertIn(
+                f'line {line}: time_minutes must be an integer',
+                stderr.getvalue(),
+            )
+
+    def test_import_resumes_after_last_batch(self):
+        """Test an interrupted import skips the committed batches"""
+        path = self._write('.ndjson', self._ndjson(5))
+        RecipeImport.objects.create(
+            user=self.user,
+            name=os.path.abspath(path),
+            batch_size=2,
+            batches=1,
+            imported=2,
+        )
+
+        self._import(path)
+
+        titles = Recipe.objects.values_list('title', flat=True)
+        self.assertEqual(
+            sorted(titles), ['Recipe 2', 'Recipe 3', 'Recipe 4'],
+        )
+        self.assertEqual(RecipeImport.objects.get().imported, 5)
+
+    def test_completed_import_not_repeated(self):
+        """Test running a finished import again does nothing"""
+        path = self._write('.ndjson', self._ndjson(2))
+        self._import(path)
+
+        self._import(path)
+
+        self.assertEqual(Recipe.objects.count(), 2)
+
+    def test_import_with_worker_processes(self):
+        """Test parsing in a process pool gives the same result"""
+        path = self._write('.ndjson', self._ndjson(4))
+
+        self._import(path, batch_size=1, workers=2)
+
+        self.assertEqual(Recipe.objects.count(), 4)
+        self.assertEqual(RecipeImport.objects.get().batches, 4)
+
+
+class SeedScaleTests(TestCase):
+    """Test the seed_scale command"""
+
+    def _seed(self, prefix, **options):
+        options = {
+            'users': 2, 'heavy_users': 1, 'heavy_recipes': 30,
+            'recipes': 5, 'tags': 6, 'ingredients': 10, 'batch_size': 7,
+            'seed': 3, **options,
+        }
+        call_command(
+            'seed_scale', email_prefix=prefix, stdout=io.StringIO(),
+            **options
+        )
+
+    def _summary(self, prefix):
+        return [
+            (recipe.title, recipe.time_minutes, str(recipe.price),
+             sorted(tag.name for tag in recipe.tags.all()))
+            for recipe in Recipe.objects.filter(
+                user__email__startswith=f'{prefix}-',
+            ).order_by('user__email', 'id').prefetch_related('tags')
+        ]
+
+    def test_seed_heavy_user_and_links(self):
+        """Test the heavy user's recipes and links stay within users"""
+        self._seed('a')
+
+        heavy = get_user_model().objects.get(email='a-0@example.com')
+        self.assertEqual(Recipe.objects.filter(user=heavy).count(), 30)
+        self.assertEqual(get_user_model().objects.count(), 3)
+        self.assertEqual(Tag.objects.filter(user=heavy).count(), 6)
+        self.assertFalse(Recipe.tags.through.objects.exclude(
+            tag__user=models.F('recipe__user'),
+        ).exists())
+        self.assertTrue(heavy.check_password('seed-password'))
+
+    def test_seed_is_deterministic(self):
+        """Test the same seed gives the same data"""
+        self._seed('a')
+        self._seed('b')
+        self._seed('c', seed=4)
+
+        self.assertEqual(self._summary('a'), self._summary('b'))
+        self.assertNotEqual(self._summary('a'), self._summary('c'))
+
+    def test_seed_existing_prefix_fails(self):
+        """Test seeding twice with one prefix raises an error"""
+        self._seed('a', users=0)
+
+        with self.assertRaises(CommandError):
+            self._seed('a', users=0)
+
+
+class BenchmarkCommandsTests(TestCase):
+    """Smoke test the benchmark commands"""
+
+    def _run(self, name, **options):
+        stdout = io.StringIO()
+        call_command(name, stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def test_bench_serializers(self):
+        """Test bench_serializers reports both paths and cleans up"""
+        output = self._run('bench_serializers', recipes=5, repeat=1)
+
+        self.assertIn('model:', output)
+        self.assertIn('fast:', output)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bench_login(self):
+        """Test bench_login verifies passwords through the hash pool"""
+        output = self._run('bench_login', logins=2, concurrency=2)
+
+        self.assertIn('single thread:', output)
+        self.assertIn('hash pool:', output)
+
+    def test_bench_renderers(self):
+        """Test bench_renderers reports every format and cleans up"""
+        output = self._run('bench_renderers', recipes=5, repeat=1)
+
+        for name in ('json:', 'orjson:', 'msgpack:'):
+            self.assertIn(name, output)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bench_endpoints(self):
+        """Test bench_endpoints writes a result per endpoint and cleans up"""
+        handle, path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+
+        self._run(
+            'bench_endpoints', sizes='2', repeat=1, warmup=0,
+            alloc_repeat=1, json=path,
+        )
+
+        with open(path) as file:
+            results = {
+                result['endpoint']: result
+                for result in json.load(file)['results']
+            }
+        self.assertIn('user-token', results)
+        cold = results['recipes-list']
+        warm = results['recipes-list-cached']
+        self.assertEqual((cold['cache'], warm['cache']), ('cold', 'warm'))
+        self.assertLess(warm['queries'], cold['queries'])
+        # transaction control is not counted as queries
+        self.assertGreater(results['recipe-update']['savepoints'], 0)
+        self.assertFalse(Recipe.objects.exists())
+
+
+class BenchAsgiCommandTests(TransactionTestCase):
+    """Smoke test bench_asgi, whose handlers read on other connections"""
+
+    def test_bench_asgi(self):
+        """Test bench_asgi serves every handler without errors"""
+        stdout = io.StringIO()
+        call_command(
+            'bench_asgi', requests=4, concurrency=2, recipes=2,
+            host='testserver', stdout=stdout,
+        )
+
+        output = stdout.getvalue()
+        for name in ('wsgi:', 'asgi:', 'asgi+pool:'):
+            line = next(
+                line for line in output.splitlines()
+                if line.startswith(name)
+            )
+            self.assertTrue(line.endswith(' 0 errors'), line)
+        self.assertIn("'completed'", output)
+        self.assertFalse(get_user_model().objects.exists())
@@ -0,0 +1,225 @@
+"""
+Tests for the database connection pool.
+"""
+
+from unittest.mock import patch
+
+import psycopg2
+from psycopg2.extensions import (
+    TRANSACTION_STATUS_IDLE,
+    TRANSACTION_STATUS_INTRANS,
+)
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.db.pool import (
+    ConnectionPool,
+    PoolTimeout,
+)
+
+POOL_STATS_URL = reverse('db-pool-stats')
+RUNTIME_STATS_URL = reverse('runtime-stats')
+
+
+class FakeCursor:
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        if self.conn.broken:
+            raise psycopg2.OperationalError('server closed the connection')
+        self.conn.pings += 1
+
+
+class FakeConnection:
+    """Stand-in for a psycopg2 connection."""
+
+    def __init__(self):
+        self.closed = 0
+        self.autocommit = True
+        self.broken = False
+        self.pings = 0
+        self.status = TRANSACTION_STATUS_IDLE
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.status = TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Test checking connections in and out of the pool."""
+
+    def test_released_connection_reused(self):
+        """Test a released connection is handed out again."""
+        pool = ConnectionPool(max_size=2)
+        conn = pool.checkout(FakeConnection)
+        pool.release(conn)
+
+        self.assertIs(pool.checkout(FakeConnection), conn)
+        stats = pool.stats()
+        self.assertEqual(stats['created'], 1)
+        self.assertEqual(stats['checkouts'], 2)
+        self.assertEqual(stats['in_use'], 1)
+
+    def test_full_pool_times_out(self):
+        """Test checkout fails once max_size connections are in use."""
+        pool = ConnectionPool(max_size=1, timeout=0.01)
+        pool.checkout(FakeConnection)
+
+        with self.assertRaises(PoolTimeout):
+            pool.checkout(FakeConnection)
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_open_transaction_rolled_back_on_release(self):
+        """Test a connection left in a transaction is rolled back."""
+        pool = ConnectionPool()
+        conn = pool.checkout(FakeConnection)
+        conn.status = TRANSACTION_STATUS_INTRANS
+
+        pool.release(conn)
+
+        self.assertEqual(conn.status, TRANSACTION_STATUS_IDLE)
+        self.assertEqual(pool.stats()['idle'], 1)
+
+    def test_broken_connection_replaced_on_checkout(self):
+        """Test an idle connection failing its health check is closed."""
+        pool = ConnectionPool(check_after=0)
+        conn = pool.checkout(FakeConnection)
+        pool.release(conn)
+        conn.broken = True
+
+        fresh = pool.checkout(FakeConnection)
+
+        self.assertIsNot(fresh, conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.stats()['failed_checks'], 1)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_idle_connections_reaped_to_min_size(self):
+        """Test connections idle past max_idle are closed above min_size."""
+        pool = ConnectionPool(min_size=1, max_idle=60, max_lifetime=10 ** 10)
+        first = pool.checkout(FakeConnection)
+        second = pool.checkout(FakeConnection)
+        pool.release(first)
+        pool.release(second)
+
+        with patch('core.db.pool.time.monotonic', return_value=10 ** 9):
+            pool.checkout(FakeConnection)
+
+        self.assertTrue(first.closed)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_idle_connections_reaped_on_release(self):
+        """Test idle connections are also reaped when one is released."""
+        pool = ConnectionPool(max_idle=60, max_lifetime=10 ** 10)
+        first = pool.checkout(FakeConnection)
+        second = pool.checkout(FakeConnection)
+        pool.release(first)
+
+        with patch('core.db.pool.time.monotonic', return_value=10 ** 9):
+            pool.release(second)
+
+        self.assertTrue(first.closed)
+        self.assertFalse(second.closed)
+        self.assertEqual(pool.stats()['idle'], 1)
+
+    def test_checkout_warms_up_to_min_size(self):
+        """Test the first checkout opens min_size connections."""
+        pool = ConnectionPool(min_size=3)
+        conn = pool.checkout(FakeConnection)
+        pool._filler.join(5)
+
+        stats = pool.stats()
+        self.assertEqual(stats['size'], 3)
+        self.assertEqual(stats['idle'], 2)
+        self.assertEqual(stats['in_use'], 1)
+        pool.release(conn)
+        self.assertEqual(pool.stats()['created'], 3)
+
+    def test_close_all_closes_in_use_on_release(self):
+        """Test connections checked out before close_all are not reused."""
+        pool = ConnectionPool()
+        conn = pool.checkout(FakeConnection)
+        pool.close_all()
+
+        pool.release(conn)
+
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.stats()['size'], 0)
+
+
+class PoolStatsApiTests(TestCase):
+    """Test the pool and runtime stats endpoints."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_requires_staff(self):
+        """Test regular users cannot read the pool stats."""
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(user)
+
+        res = self.client.get(POOL_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_staff_can_read_stats(self):
+        """Test staff users get the stats of the default pool."""
+        user = get_user_model().objects.create_superuser(
+            email='admin@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(user)
+
+        res = self.client.get(POOL_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('in_use', res.data['default'])
+
+    def test_staff_can_read_runtime_stats(self):
+        """Test staff users get the hash pool and recipe cache counters."""
+        user = get_user_model().objects.create_superuser(
+            email='admin@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(user)
+
+        res = self.client.get(RUNTIME_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('queued', res.data['password_hash_pool'])
+        self.assertIn('hits', res.data['recipe_cache'])
+
+    def test_runtime_stats_require_staff(self):
+        """Test regular users cannot read the runtime stats."""
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(user)
+
+        res = self.client.get(RUNTIME_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
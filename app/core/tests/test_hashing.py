@@ -0,0 +1,135 @@
+"""
+Tests for password hashing.
+"""
+
+import threading
+from unittest.mock import Mock, patch
+
+from django.contrib.auth import (
+    get_user_model,
+    user_login_failed,
+)
+from django.contrib.auth.hashers import make_password
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.hashing import (
+    PasswordHashPool,
+    PoolSaturated,
+    authenticate_user,
+)
+
+TOKEN_URL = reverse('user:token')
+
+
+class PasswordHashPoolTests(SimpleTestCase):
+    """Test the bounded hash pool."""
+
+    def test_run_returns_result(self):
+        """Test work submitted to the pool returns its result."""
+        pool = PasswordHashPool(workers=1, max_queue=0)
+
+        self.assertEqual(pool.run(sum, [1, 2, 3]), 6)
+        self.assertEqual(pool.stats()['completed'], 1)
+
+    def test_saturated_pool_rejects(self):
+        """Test calls beyond the workers and queue are rejected."""
+        pool = PasswordHashPool(workers=1, max_queue=0)
+        started = threading.Event()
+        release = threading.Event()
+
+        def block():
+            started.set()
+            release.wait(5)
+
+        worker = threading.Thread(target=pool.run, args=(block,))
+        worker.start()
+        started.wait(5)
+        try:
+            with self.assertRaises(PoolSaturated):
+                pool.run(sum, [1])
+            self.assertEqual(pool.stats()['running'], 1)
+        finally:
+            release.set()
+            worker.join()
+
+        self.assertEqual(pool.stats()['rejected'], 1)
+        self.assertEqual(pool.run(sum, [1]), 1)
+
+    @override_settings(PASSWORD_HASH_ITERATIONS=1000)
+    def test_hasher_iterations_configurable(self):
+        """Test the PBKDF2 cost follows the setting."""
+        encoded = make_password('testpass123')
+
+        self.assertTrue(encoded.startswith('pbkdf2_sha256$1000$'))
+
+
+class AuthenticateUserTests(TestCase):
+    """Test authenticating users through the hash pool."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+
+    def test_valid_credentials(self):
+        user = authenticate_user(None, 'user@example.com', 'testpass123')
+
+        self.assertEqual(user, self.user)
+
+    def test_invalid_credentials(self):
+        self.assertIsNone(authenticate_user(None, 'user@example.com', 'wrong'))
+        self.assertIsNone(authenticate_user(None, 'nobody@example.com', 'x'))
+
+    def test_failed_login_signalled(self):
+        """Test authenticate sends user_login_failed for bad passwords."""
+        handler = Mock()
+        user_login_failed.connect(handler)
+        self.addCleanup(user_login_failed.disconnect, handler)
+
+        authenticate_user(None, 'user@example.com', 'wrong')
+
+        handler.assert_called_once()
+        self.assertEqual(
+            handler.call_args.kwargs['credentials']['username'],
+            'user@example.com',
+        )
+
+    @override_settings(AUTHENTICATION_BACKENDS=[
+        'django.contrib.auth.backends.AllowAllUsersModelBackend',
+    ])
+    def test_configured_backends_used(self):
+        """Test the backends in AUTHENTICATION_BACKENDS are honoured."""
+        self.user.is_active = False
+        self.user.save()
+
+        user = authenticate_user(None, 'user@example.com', 'testpass123')
+
+        self.assertEqual(user, self.user)
+
+    def test_hash_upgraded_to_current_cost(self):
+        """Test a password hashed at an old cost is re-encoded."""
+        with self.settings(PASSWORD_HASH_ITERATIONS=1000):
+            authenticate_user(None, 'user@example.com', 'testpass123')
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$1000$'))
+
+    def test_token_saturated_returns_429(self):
+        """Test logins get a 429 while the hash pool is saturated."""
+        client = APIClient()
+        payload = {'email': 'user@example.com', 'password': 'testpass123'}
+
+        with patch('core.hashing.PasswordHashPool.run') as run:
+            run.side_effect = PoolSaturated()
+            res = client.post(TOKEN_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
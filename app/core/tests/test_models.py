@@ -5,6 +5,7 @@ from unittest.mock import patch
 from decimal import Decimal
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 
 from core import models
 
@@ -75,6 +76,16 @@ class ModelTests(TestCase):
 
         self.assertEqual(str(tag), tag.name)
 
+    def test_tag_name_validated_ignoring_case(self):
+        """Test model validation rejects a case-insensitive duplicate."""
+        user = create_user()
+        models.Tag.objects.create(user=user, name='Vegan')
+
+        with self.assertRaises(ValidationError):
+            models.Tag(user=user, name='VEGAN').full_clean()
+        other = create_user(email='other@example.com')
+        models.Tag(user=other, name='VEGAN').full_clean()
+
     def test_create_ingredient(self):
         """Test Creating an ingredient is successful."""
         user = create_user()
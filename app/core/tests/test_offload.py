@@ -0,0 +1,193 @@
+"""
+Tests for offloading views to the ASGI view pool.
+"""
+
+import asyncio
+import threading
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import URLPattern, URLResolver, path
+
+from user import urls as user_urls
+
+from core.offload import (
+    OffloadingASGIHandler,
+    ViewThreadPool,
+    offload,
+    offload_include,
+)
+
+STREAM_PARTS = 100
+
+# shared with the pool thread that iterates StreamParts
+stream_state = {}
+
+
+class StreamParts:
+    """Parts of a streamed response that record how far they got."""
+
+    def __iter__(self):
+        for i in range(STREAM_PARTS):
+            stream_state['produced'] += 1
+            yield f'{i},'.encode()
+
+    def close(self):
+        stream_state['closed'].set()
+
+
+def thread_name_view(request):
+    return HttpResponse(threading.current_thread().name)
+
+
+def stream_view(request):
+    return StreamingHttpResponse(StreamParts())
+
+
+urlpatterns = [
+    path('stream/', stream_view),
+]
+
+
+class OffloadTests(SimpleTestCase):
+    """Test the offload view wrapper."""
+
+    def setUp(self):
+        self.pool = ViewThreadPool(workers=1, max_queue=0)
+        patcher = patch('core.offload.get_view_pool', return_value=self.pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.request = RequestFactory().get('/')
+
+    def test_offload_returns_coroutine_function(self):
+        """Test the wrapped view is async so Django awaits it directly."""
+        view = offload(thread_name_view)
+
+        self.assertTrue(asyncio.iscoroutinefunction(view))
+        self.assertIs(offload(view), view)
+
+    def test_view_runs_on_pool_thread(self):
+        """Test the view body runs on one of the pool threads."""
+        view = offload(thread_name_view)
+
+        res = async_to_sync(view)(self.request)
+
+        self.assertTrue(res.content.startswith(b'asgi-view'))
+        self.assertEqual(self.pool.stats()['completed'], 1)
+
+    def test_saturated_pool_returns_503(self):
+        """Test requests beyond the workers and queue are rejected."""
+        view = offload(thread_name_view)
+        self.assertTrue(self.pool.try_acquire())
+
+        res = async_to_sync(view)(self.request)
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res['Retry-After'], '1')
+        self.assertEqual(self.pool.stats()['rejected'], 1)
+
+    def test_offload_include_copies_patterns(self):
+        """Test included views are offloaded without changing the module."""
+        patterns, app_name, namespace = offload_include('user.urls')
+        resolver = path('api/user/', (patterns, app_name, namespace))
+
+        self.assertIsInstance(resolver, URLResolver)
+        self.assertEqual(namespace, 'user')
+        for original, pattern in zip(user_urls.urlpatterns, patterns):
+            self.assertIsInstance(pattern, URLPattern)
+            self.assertEqual(pattern.name, original.name)
+            self.assertTrue(asyncio.iscoroutinefunction(pattern.callback))
+            self.assertFalse(
+                asyncio.iscoroutinefunction(original.callback)
+            )
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class OffloadingASGIHandlerTests(SimpleTestCase):
+    """Test streaming responses through the ASGI handler."""
+
+    def setUp(self):
+        self.pool = ViewThreadPool(workers=1, max_queue=0)
+        patcher = patch('core.offload.get_view_pool', return_value=self.pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        stream_state.update(produced=0, closed=threading.Event())
+        self.state = stream_state
+        self.messages = []
+
+    def _call(self, send=None):
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': '/stream/',
+            'raw_path': b'/stream/',
+            'query_string': b'',
+            'root_path': '',
+            'headers': [(b'host', b'testserver')],
+            'client': ('127.0.0.1', 0),
+            'server': ('testserver', 80),
+        }
+        received = []
+
+        async def receive():
+            if not received:
+                received.append(True)
+                return {'type': 'http.request', 'body': b''}
+            return {'type': 'http.disconnect'}
+
+        async def record(message):
+            self.messages.append(message)
+
+        async_to_sync(OffloadingASGIHandler())(scope, receive, send or record)
+
+    def _body(self):
+        return b''.join(
+            message.get('body', b'') for message in self.messages
+            if message['type'] == 'http.response.body'
+        )
+
+    def test_stream_reaches_client(self):
+        """Test every part of a streamed response is sent, then closed."""
+        self._call()
+
+        self.assertEqual(self.messages[0]['status'], 200)
+        self.assertEqual(
+            self._body(),
+            b''.join(f'{i},'.encode() for i in range(STREAM_PARTS)),
+        )
+        self.assertFalse(self.messages[-1].get('more_body', False))
+        self.assertTrue(self.state['closed'].is_set())
+        self.assertEqual(self.pool.stats()['completed'], 1)
+
+    def test_disconnect_mid_stream_closes_response(self):
+        """Test a client going away stops the producer and closes it."""
+        async def send(message):
+            # what a server does once the client has disconnected
+            if message['type'] == 'http.response.body':
+                raise OSError('client disconnected')
+            self.messages.append(message)
+
+        with self.assertRaises(OSError):
+            self._call(send)
+
+        self.assertTrue(self.state['closed'].is_set())
+        self.assertLess(self.state['produced'], STREAM_PARTS)
+        stats = self.pool.stats()
+        self.assertEqual((stats['running'], stats['completed']), (0, 1))
+
+    def test_saturated_pool_returns_503(self):
+        """Test a stream that cannot get a pool slot is closed and refused."""
+        self.assertTrue(self.pool.try_acquire())
+
+        self._call()
+
+        self.assertEqual(self.messages[0]['status'], 503)
+        self.assertIn(b'Server busy', self._body())
+        self.assertTrue(self.state['closed'].is_set())
+        self.assertEqual(self.state['produced'], 0)
+        self.assertEqual(self.pool.stats()['rejected'], 1)
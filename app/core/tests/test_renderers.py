@@ -0,0 +1,167 @@
+"""
+Tests for the API renderers and parsers.
+"""
+
+import io
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import msgpack
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from drf_spectacular.generators import SchemaGenerator
+
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.parsers import (
+    MessagePackParser,
+    ORJSONParser,
+)
+from core.renderers import (
+    MessagePackRenderer,
+    ORJSONRenderer,
+)
+
+RECIPES_URL = reverse('recipe:recipe-list')
+MSGPACK = 'application/msgpack'
+
+PAYLOAD = {
+    'id': 1,
+    'title': 'Crème brûlée',
+    'price': Decimal('5.50'),
+    'price_text': '5.50',
+    'created': datetime(2021, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc),
+    'day': date(2021, 5, 1),
+    'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    'description': 'line\u2028break',
+    'detail': gettext_lazy('Not found.'),
+    'tags': [{'id': 1, 'name': 'Dessert'}, {'id': 2, 'name': 'French'}],
+    'rating': 4.25,
+    'link': None,
+    'published': True,
+}
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    """Test the orjson renderer matches JSONRenderer."""
+
+    def test_output_matches_json_renderer(self):
+        """Test rendering produces the same bytes as JSONRenderer."""
+        self.assertEqual(
+            ORJSONRenderer().render(PAYLOAD),
+            JSONRenderer().render(PAYLOAD),
+        )
+
+    def test_indented_output_matches(self):
+        """Test indented rendering falls back to matching output."""
+        media_type = 'application/json; indent=4'
+
+        self.assertEqual(
+            ORJSONRenderer().render(PAYLOAD, media_type),
+            JSONRenderer().render(PAYLOAD, media_type),
+        )
+
+    def test_large_integer_matches(self):
+        """Test integers orjson cannot encode are still rendered."""
+        data = {'big': 2 ** 70}
+
+        self.assertEqual(
+            ORJSONRenderer().render(data),
+            JSONRenderer().render(data),
+        )
+
+    def test_none_renders_empty(self):
+        """Test no data renders an empty body."""
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+
+class ORJSONParserTests(SimpleTestCase):
+    """Test the orjson parser."""
+
+    def test_parse_round_trip(self):
+        """Test rendered data parses back to the same values."""
+        body = ORJSONRenderer().render({'title': 'Crème', 'tags': [1, 2]})
+
+        data = ORJSONParser().parse(io.BytesIO(body))
+
+        self.assertEqual(data, {'title': 'Crème', 'tags': [1, 2]})
+
+    def test_invalid_json_raises_parse_error(self):
+        """Test malformed JSON is rejected with a 400 error."""
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b'{"title": '))
+
+
+class MessagePackTests(SimpleTestCase):
+    """Test the MessagePack renderer and parser."""
+
+    def test_round_trip_keeps_decimal_exact(self):
+        """Test Decimal values come back as exact strings."""
+        body = MessagePackRenderer().render({'price': Decimal('0.10')})
+
+        data = MessagePackParser().parse(io.BytesIO(body))
+
+        self.assertEqual(data, {'price': '0.10'})
+
+    def test_datetime_rendered_like_json(self):
+        """Test datetimes use the same format as the JSON API."""
+        body = MessagePackRenderer().render({'created': PAYLOAD['created']})
+
+        data = msgpack.unpackb(body)
+
+        self.assertEqual(data['created'], '2021-05-01T12:30:15.123456Z')
+
+    def test_invalid_body_raises_parse_error(self):
+        """Test malformed MessagePack is rejected with a 400 error."""
+        with self.assertRaises(ParseError):
+            MessagePackParser().parse(io.BytesIO(b'\xc1'))
+
+    def test_schema_advertises_msgpack(self):
+        """Test the OpenAPI schema lists the MessagePack media type."""
+        schema = SchemaGenerator().get_schema(request=None, public=True)
+
+        operation = schema['paths']['/api/recipe/recipes/']['post']
+        self.assertIn(MSGPACK, operation['requestBody']['content'])
+        self.assertIn(MSGPACK, operation['responses']['201']['content'])
+
+
+class MessagePackApiTests(TestCase):
+    """Test negotiating MessagePack on the API."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_create_and_list_with_msgpack(self):
+        """Test a recipe posted and listed as MessagePack."""
+        payload = {
+            'title': 'Soup',
+            'time_minutes': 10,
+            'price': '2.50',
+            'tags': [{'name': 'Dinner'}],
+        }
+        res = self.client.post(
+            RECIPES_URL,
+            msgpack.packb(payload),
+            content_type=MSGPACK,
+            HTTP_ACCEPT=MSGPACK,
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res['Content-Type'], MSGPACK)
+
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT=MSGPACK)
+
+        data = msgpack.unpackb(res.content)
+        self.assertEqual(res['Content-Type'], MSGPACK)
+        self.assertEqual(data['results'][0]['price'], '2.50')
+        self.assertEqual(data['results'][0]['tags'][0]['name'], 'Dinner')
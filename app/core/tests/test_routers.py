@@ -0,0 +1,136 @@
+"""
+Tests for the read replica router.
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import DataVersion, Tag
+from core.routers import ReplicaRouter
+
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(tag_id):
+    return reverse('recipe:tag-detail', args=[tag_id])
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(TestCase):
+    """Test which database API requests read from."""
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _get_tags(self):
+        """Return the queries on the primary and replica, except the
+        data version read, which always uses the primary."""
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            res = self.client.get(TAGS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        version_table = DataVersion._meta.db_table
+        primary = [
+            query for query in primary.captured_queries
+            if version_table not in query['sql']
+        ]
+        return len(primary), len(replica)
+
+    def test_safe_reads_use_replica(self):
+        """Test listing tags only queries the replica."""
+        primary, replica = self._get_tags()
+
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_data_version_read_on_primary(self):
+        """Test the version behind ETags is never read from a replica."""
+        with CaptureQueriesContext(connections['replica']) as replica:
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(any(
+            DataVersion._meta.db_table in query['sql']
+            for query in replica.captured_queries
+        ))
+
+    def test_reads_stick_to_primary_after_write(self):
+        """Test a user's reads go to the primary right after a write."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        res = self.client.patch(detail_url(tag.id), {'name': 'Dessert'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        primary, replica = self._get_tags()
+
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_pin_does_not_need_cookies(self):
+        """Test a client without cookies still reads its own writes."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        res = self.client.patch(detail_url(tag.id), {'name': 'Dessert'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        # a client that drops cookies, served by another worker
+        self.client.cookies.clear()
+        cache.clear()
+
+        primary, replica = self._get_tags()
+
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_pin_expires(self):
+        """Test reads return to the replica after the sticky window."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.client.patch(detail_url(tag.id), {'name': 'Dessert'})
+
+        with override_settings(REPLICA_STICKY_SECONDS=0):
+            primary, replica = self._get_tags()
+
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_pin_scoped_to_user(self):
+        """Test a write by another user does not pin this one."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.client.patch(detail_url(tag.id), {'name': 'Dessert'})
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(other)
+
+        primary, replica = self._get_tags()
+
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_reads_use_primary_without_replicas(self):
+        """Test reads stay on the primary when no replica is configured."""
+        primary, replica = self._get_tags()
+
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_writes_and_migrations_use_primary(self):
+        """Test the router never writes or migrates a replica."""
+        router = ReplicaRouter()
+
+        self.assertEqual(router.db_for_write(Tag), 'default')
+        self.assertFalse(router.allow_migrate('replica', 'core'))
+        self.assertIsNone(router.db_for_read(Tag))
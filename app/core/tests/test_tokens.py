@@ -0,0 +1,235 @@
+"""
+Tests for signed access tokens and refresh tokens.
+"""
+
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, RefreshToken, RevokedAccessToken
+from core.tokens import (
+    issue_access_token,
+    issue_token_pair,
+    revocations,
+)
+from recipe.cache import get_cache
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TOKEN_URL = reverse('user:token')
+REFRESH_URL = reverse('user:token-refresh')
+REVOKE_URL = reverse('user:token-revoke')
+ME_URL = reverse('user:me')
+
+
+def create_user(**params):
+    defaults = {'email': 'user@example.com', 'password': 'testpass123'}
+    defaults.update(params)
+    return get_user_model().objects.create_user(**defaults)
+
+
+class SignedTokenTests(TestCase):
+    """Test authenticating with signed access tokens."""
+
+    def setUp(self):
+        cache.clear()
+        revocations.clear()
+        self.user = create_user()
+        self.client = APIClient()
+
+    def _auth(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_recipe_list_needs_no_auth_query(self):
+        """Test a signed token is verified without touching the database."""
+        Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price='1.00',
+        )
+        token, _ = issue_access_token(self.user)
+        self._auth(token)
+        # the first request loads the revocation list
+        self.client.get(RECIPES_URL)
+        get_cache().clear()
+
+        # the data version, recipes and two prefetches, no user lookup
+        with self.assertNumQueries(4):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_expired_token_rejected(self):
+        """Test an access token past its expiry is rejected."""
+        token, expires = issue_access_token(self.user)
+        self._auth(token)
+
+        with patch('core.tokens.time.time', return_value=expires + 1):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_tampered_token_rejected(self):
+        """Test a token with a modified payload is rejected."""
+        token, _ = issue_access_token(self.user)
+        last = 'A' if token[-1] != 'A' else 'B'
+        self._auth(token[:-1] + last)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revoke_rejects_access_and_refresh(self):
+        """Test logging out revokes both tokens of the pair."""
+        tokens = issue_token_pair(self.user)
+        self._auth(tokens['access'])
+
+        res = self.client.post(REVOKE_URL, {'refresh': tokens['refresh']})
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertFalse(RefreshToken.objects.exists())
+
+    def test_revoke_keeps_other_users_refresh_token(self):
+        """Test logging out cannot delete another user's refresh token."""
+        other = create_user(email='other@example.com')
+        other_tokens = issue_token_pair(other)
+        token, _ = issue_access_token(self.user)
+        self._auth(token)
+
+        res = self.client.post(REVOKE_URL, {
+            'refresh': other_tokens['refresh'],
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertTrue(RefreshToken.objects.filter(user=other).exists())
+
+    def test_deactivating_user_revokes_tokens(self):
+        """Test tokens issued before deactivation stop working."""
+        token, _ = issue_access_token(self.user)
+        self.user.is_active = False
+        self.user.save()
+        self._auth(token)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revocation_shared_between_processes(self):
+        """Test a revoked token stays rejected after reloading the list."""
+        tokens = issue_token_pair(self.user)
+        self._auth(tokens['access'])
+        self.client.post(REVOKE_URL, {'refresh': tokens['refresh']})
+
+        # what another process without the in-memory copy sees
+        revocations.clear()
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertTrue(RevokedAccessToken.objects.filter(
+            user=self.user, jti__isnull=False,
+        ).exists())
+
+    def test_revocation_by_other_process_seen_after_refresh(self):
+        """Test revocations stored elsewhere are picked up on reload."""
+        token, expires = issue_access_token(self.user)
+        self._auth(token)
+        self.assertEqual(
+            self.client.get(RECIPES_URL).status_code, status.HTTP_200_OK,
+        )
+        RevokedAccessToken.objects.create(
+            user=self.user,
+            issued_before=int(time.time()),
+            expires=timezone.now() + timedelta(minutes=5),
+        )
+
+        with self.settings(ACCESS_TOKEN_REVOCATION_REFRESH=0):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_user_token_rejected_on_write(self):
+        """Test a deleted user's token gets 401 instead of a server error."""
+        token, _ = issue_access_token(self.user)
+        self._auth(token)
+        self.user.delete()
+
+        res = self.client.post(RECIPES_URL, {
+            'title': 'Orphan', 'time_minutes': 5, 'price': '1.00',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_reactivated_user_tokens_stay_revoked(self):
+        """Test tokens issued before a deactivation never work again."""
+        token, _ = issue_access_token(self.user)
+        self.user.is_active = False
+        self.user.save()
+        self.user.is_active = True
+        self.user.save()
+        self._auth(token)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_me_loads_profile(self):
+        """Test the profile endpoint returns the full user."""
+        token, _ = issue_access_token(self.user)
+        self._auth(token)
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+
+class RefreshTokenTests(TestCase):
+    """Test issuing and rotating refresh tokens."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        self.client = APIClient()
+
+    @override_settings(AUTH_TOKEN_MODE='signed')
+    def test_login_returns_token_pair(self):
+        """Test logging in in signed mode returns access and refresh."""
+        res = self.client.post(TOKEN_URL, {
+            'email': 'user@example.com',
+            'password': 'testpass123',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('access', res.data)
+        self.assertIn('refresh', res.data)
+        self.assertGreater(res.data['access_expires'], time.time())
+
+    def test_refresh_rotates_token(self):
+        """Test a refresh token is exchanged once for a new pair."""
+        tokens = issue_token_pair(self.user)
+
+        res = self.client.post(REFRESH_URL, {'refresh': tokens['refresh']})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res.data['refresh'], tokens['refresh'])
+
+        res = self.client.post(REFRESH_URL, {'refresh': tokens['refresh']})
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_inactive_user_rejected(self):
+        """Test a refresh token of an inactive user is rejected."""
+        tokens = issue_token_pair(self.user)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.post(REFRESH_URL, {'refresh': tokens['refresh']})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,236 @@
+"""
+Stateless signed access tokens with database backed refresh tokens.
+
+Access tokens are HMAC signed with ``SECRET_KEY`` and carry the user id
+and expiry, so verifying one reads no table. Revocations are stored in
+``RevokedAccessToken`` and checked against an in-process copy that is
+reloaded every ``ACCESS_TOKEN_REVOCATION_REFRESH`` seconds, so another
+process rejects a revoked token within that interval and this one at
+once. Tokens are short lived, which keeps the denylist small: a revoked
+token only has to be remembered until it would have expired anyway.
+"""
+
+import hashlib
+import secrets
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import (
+    RefreshToken,
+    RevokedAccessToken,
+)
+
+SALT = 'core.tokens.access'
+
+
+class InvalidToken(Exception):
+    """Raised for a bad, expired or revoked token."""
+
+
+class AccessToken:
+    """The verified claims of a signed access token."""
+
+    def __init__(self, user_id, expires, issued, jti):
+        self.user_id = user_id
+        self.expires = expires
+        self.issued = issued
+        self.jti = jti
+
+
+def issue_access_token(user):
+    """Return a new signed access token and its expiry timestamp."""
+    issued = int(time.time())
+    expires = issued + settings.ACCESS_TOKEN_TTL
+    token = signing.dumps(
+        {
+            'uid': user.pk,
+            'iat': issued,
+            'exp': expires,
+            'jti': uuid.uuid4().hex,
+        },
+        salt=SALT,
+    )
+    return token, expires
+
+
+class RevocationList:
+    """In-process copy of the unexpired ``RevokedAccessToken`` rows.
+
+    Lookups never query; the rows are reloaded in one query once the copy
+    is older than ``ACCESS_TOKEN_REVOCATION_REFRESH`` seconds. Revocations
+    made in this process are added straight away.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jtis = frozenset()
+        # user id -> tokens issued up to this timestamp are revoked
+        self._cutoffs = {}
+        self._loaded = None
+
+    def is_revoked(self, access):
+        """Return whether ``access`` was revoked."""
+        if self._stale():
+            self.reload()
+        return (
+            access.jti in self._jtis or
+            self._cutoffs.get(access.user_id, -1) >= access.issued
+        )
+
+    def reload(self):
+        """Replace the copy with the unexpired rows in the database."""
+        with self._lock:
+            jtis = set()
+            cutoffs = {}
+            rows = RevokedAccessToken.objects.filter(
+                expires__gt=timezone.now(),
+            ).values_list('user_id', 'jti', 'issued_before')
+            for user_id, jti, issued_before in rows:
+                if jti is not None:
+                    jtis.add(jti)
+                else:
+                    cutoffs[user_id] = max(
+                        cutoffs.get(user_id, issued_before), issued_before,
+                    )
+            self._jtis = frozenset(jtis)
+            self._cutoffs = cutoffs
+            self._loaded = time.monotonic()
+
+    def add_jti(self, jti):
+        with self._lock:
+            self._jtis = self._jtis | {jti}
+
+    def add_cutoff(self, user_id, issued_before):
+        with self._lock:
+            cutoffs = dict(self._cutoffs)
+            cutoffs[user_id] = max(
+                cutoffs.get(user_id, issued_before), issued_before,
+            )
+            self._cutoffs = cutoffs
+
+    def clear(self):
+        """Forget the copy so the next lookup reloads it."""
+        with self._lock:
+            self._jtis = frozenset()
+            self._cutoffs = {}
+            self._loaded = None
+
+    def _stale(self):
+        loaded = self._loaded
+        return loaded is None or (
+            time.monotonic() - loaded >=
+            settings.ACCESS_TOKEN_REVOCATION_REFRESH
+        )
+
+
+revocations = RevocationList()
+
+
+def verify_access_token(token):
+    """Return the claims of a valid, unrevoked access token.
+
+    Raises ``InvalidToken`` when the token is bad, expired or revoked.
+    Whether its user still exists and is active is left to the caller.
+    """
+    try:
+        claims = signing.loads(token, salt=SALT)
+    except signing.BadSignature:
+        raise InvalidToken('Invalid token.')
+    access = AccessToken(
+        claims['uid'], claims['exp'], claims['iat'], claims['jti']
+    )
+    if access.expires <= time.time():
+        raise InvalidToken('Token has expired.')
+    if revocations.is_revoked(access):
+        raise InvalidToken('Token has been revoked.')
+    return access
+
+
+def _from_timestamp(value):
+    return datetime.fromtimestamp(value, tz=dt_timezone.utc)
+
+
+def revoke_access_token(access):
+    """Reject an access token until it would have expired."""
+    RevokedAccessToken.objects.get_or_create(
+        jti=access.jti,
+        defaults={
+            'user_id': access.user_id,
+            'expires': _from_timestamp(access.expires),
+        },
+    )
+    revocations.add_jti(access.jti)
+
+
+def revoke_user_tokens(user_id):
+    """Reject every access token issued to a user up to now."""
+    now = int(time.time())
+    RevokedAccessToken.objects.create(
+        user_id=user_id,
+        issued_before=now,
+        expires=_from_timestamp(now + settings.ACCESS_TOKEN_TTL),
+    )
+    revocations.add_cutoff(user_id, now)
+
+
+def expired_revocations():
+    """Return denylist rows for tokens that have expired anyway."""
+    return RevokedAccessToken.objects.filter(expires__lte=timezone.now())
+
+
+def _digest(raw):
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def issue_token_pair(user):
+    """Return a new access token and refresh token for a user."""
+    raw = secrets.token_urlsafe(32)
+    refresh = RefreshToken.objects.create(
+        user=user,
+        key=_digest(raw),
+        expires=timezone.now() + timedelta(
+            seconds=settings.REFRESH_TOKEN_TTL
+        ),
+    )
+    access, access_expires = issue_access_token(user)
+    return {
+        'access': access,
+        'access_expires': access_expires,
+        'refresh': raw,
+        'refresh_expires': int(refresh.expires.timestamp()),
+    }
+
+
+def rotate_refresh_token(raw):
+    """Exchange a refresh token for a new token pair.
+
+    The presented refresh token is deleted, so each one works only once.
+    """
+    with transaction.atomic():
+        refresh = RefreshToken.objects.select_for_update().select_related(
+            'user'
+        ).filter(key=_digest(raw)).first()
+        if refresh is None:
+            raise InvalidToken('Invalid token.')
+        if refresh.expires <= timezone.now():
+            raise InvalidToken('Token has expired.')
+        if not refresh.user.is_active:
+            raise InvalidToken('User inactive or deleted.')
+        refresh.delete()
+        return issue_token_pair(refresh.user)
+
+
+def delete_refresh_token(raw, user_id):
+    """Delete a user's refresh token so it can no longer be used.
+
+    Tokens of other users are left alone, so a token cannot be revoked
+    by someone who merely learned it.
+    """
+    RefreshToken.objects.filter(key=_digest(raw), user_id=user_id).delete()
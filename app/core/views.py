@@ -0,0 +1,32 @@
+"""
+Views for operational endpoints.
+"""
+from rest_framework import permissions
+from rest_framework import views
+from rest_framework.response import Response
+
+from core.authentication import API_AUTHENTICATION_CLASSES
+from core.db.pool import all_stats
+from core.hashing import get_hash_pool
+from recipe import cache
+
+
+class DatabasePoolStatsView(views.APIView):
+    """Report the database connection pools of this process."""
+    authentication_classes = API_AUTHENTICATION_CLASSES
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(all_stats())
+
+
+class RuntimeStatsView(views.APIView):
+    """Report the password hash pool and recipe cache of this process."""
+    authentication_classes = API_AUTHENTICATION_CLASSES
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response({
+            'password_hash_pool': get_hash_pool().stats(),
+            'recipe_cache': cache.stats.as_dict(),
+        })
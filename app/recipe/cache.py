@@ -0,0 +1,234 @@
+"""
+Per-user versioned response cache for the recipe APIs.
+
+Every user has a data version that is bumped on any write to their recipes,
+tags or ingredients. Cached responses are keyed by that version, so a write
+makes all of the user's stale entries unreachable without deleting them.
+Versions live in the database rather than the cache, so a write by any
+process, including management commands, is seen by every other process.
+"""
+
+import hashlib
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from rest_framework.response import Response
+
+from core.models import DataVersion
+
+
+VERSION_KEY = 'recipe:version:{user_id}'
+RESPONSE_KEY = 'recipe:response:{user_id}:{version}:{digest}'
+
+
+class CacheStats:
+    """Thread safe hit/miss counters for the response cache."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def as_dict(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+
+stats = CacheStats()
+
+
+def get_cache():
+    """Return the cache backend used for recipe responses."""
+    return caches[settings.RECIPE_CACHE_ALIAS]
+
+
+def _write_connection():
+    return connections[router.db_for_write(DataVersion)]
+
+
+def _bumped_unseen(connection, user_id):
+    """Return whether the open transaction already bumped the user.
+
+    Only bumps at the same savepoint level count, and only while their
+    on_commit callback is pending, i.e. neither committed nor rolled back.
+    """
+    bumped = getattr(connection, '_bumped_versions', {})
+    if user_id not in bumped:
+        return False
+    savepoints, forget = bumped[user_id]
+    return savepoints == tuple(connection.savepoint_ids) and any(
+        pending[1] is forget for pending in connection.run_on_commit
+    )
+
+
+def _mark_bumped(connection, user_id):
+    """Skip further bumps for the user until the transaction ends."""
+    if not connection.in_atomic_block:
+        return
+    bumped = connection.__dict__.setdefault('_bumped_versions', {})
+
+    def forget():
+        if bumped.get(user_id, (None, None))[1] is forget:
+            del bumped[user_id]
+
+    bumped[user_id] = (tuple(connection.savepoint_ids), forget)
+    transaction.on_commit(forget, using=connection.alias)
+
+
+def _seen(user_id):
+    """Make the next write bump again once the version has been read."""
+    getattr(_write_connection(), '_bumped_versions', {}).pop(user_id, None)
+
+
+def _read_version(user_id):
+    """Return the user's data version and when they last wrote.
+
+    Read on the primary like the bumps: a replica lagging behind a write
+    would hand out the old version, and with it a 304 or cached response
+    for stale data.
+    """
+    _seen(user_id)
+    row = DataVersion.objects.using(
+        router.db_for_write(DataVersion),
+    ).filter(user_id=user_id).values_list('version', 'last_write').first()
+    return row or (0, None)
+
+
+def get_user_version(user_id):
+    """Return the current data version for a user."""
+    return _read_version(user_id)[0]
+
+
+def _request_row(request):
+    row = getattr(request, '_data_version', None)
+    if row is None:
+        row = _read_version(request.user.pk)
+        request._data_version = row
+    return row
+
+
+def request_version(request):
+    """Return the requesting user's data version, read once per request."""
+    return _request_row(request)[0]
+
+
+def request_last_write(request):
+    """Return when the requesting user last wrote, read once per request."""
+    return _request_row(request)[1]
+
+
+def record_write(user_id):
+    """Note that a user just wrote, so their reads can stay on the primary."""
+    table = DataVersion._meta.db_table
+    with _write_connection().cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (user_id, version, last_write)
+            VALUES (%s, 0, %s)
+            ON CONFLICT (user_id) DO UPDATE
+            SET last_write = EXCLUDED.last_write
+            """,
+            [user_id, timezone.now()],
+        )
+
+
+def _upsert_version(user_id, increment):
+    connection = _write_connection()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {DataVersion._meta.db_table} (user_id, version)
+            VALUES (%s, %s)
+            ON CONFLICT (user_id) DO UPDATE
+            SET version = {DataVersion._meta.db_table}.version + %s
+            RETURNING version
+            """,
+            [user_id, increment, increment],
+        )
+        return cursor.fetchone()[0]
+
+
+def bump_user_version(user_id):
+    """Move a user to a new data version and return it."""
+    return _upsert_version(user_id, 1)
+
+
+def lock_user_version(user_id):
+    """Return the user's data version, locking it until the transaction ends.
+
+    Writes by the same user wait for the lock, so a version checked under
+    it cannot change before the caller commits.
+    """
+    _seen(user_id)
+    return _upsert_version(user_id, 0)
+
+
+def invalidate_user(user_id):
+    """Invalidate cached responses and ETags for a user after a write.
+
+    The bump commits or rolls back with the write, so the old version
+    stays valid until the new data is visible to other connections. A
+    transaction bumps each user once; later writes in it are covered by
+    that bump unless the version was read in between.
+    """
+    connection = _write_connection()
+    if _bumped_unseen(connection, user_id):
+        return
+    bump_user_version(user_id)
+    _mark_bumped(connection, user_id)
+
+
+def skip_deleted_user(user_id):
+    """Stop bumping a user's version in the transaction deleting them.
+
+    Their recipes, tags and ingredients go with them, one post_delete
+    each, and their version row is deleted too.
+    """
+    _mark_bumped(_write_connection(), user_id)
+
+
+def response_cache_key(request):
+    """Return the cache key for a request by the authenticated user."""
+    user_id = request.user.pk
+    params = sorted(request.query_params.lists())
+    digest = hashlib.md5(
+        repr((request.path, params)).encode()
+    ).hexdigest()
+    return RESPONSE_KEY.format(
+        user_id=user_id,
+        version=request_version(request),
+        digest=digest,
+    )
+
+
+class CachedListMixin:
+    """Serve list responses from the per-user versioned cache."""
+
+    def list(self, request, *args, **kwargs):
+        cache = get_cache()
+        key = response_cache_key(request)
+        data = cache.get(key)
+        stats.record(data is not None)
+        if data is not None:
+            return Response(data)
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data)
+        return response
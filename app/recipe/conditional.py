@@ -0,0 +1,105 @@
+"""
+Conditional request support (ETag, If-None-Match, If-Match) for the recipe
+APIs.
+
+ETags are built from the per-user data version, so they can be checked
+before any queryset is evaluated or any object is serialized.
+"""
+
+import hashlib
+
+from django.db import transaction
+from django.utils.http import parse_etags
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from recipe.cache import (
+    lock_user_version,
+    request_version,
+)
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'The resource has changed since it was fetched.'
+    default_code = 'precondition_failed'
+
+
+def _strip_weak(etag):
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def _version_of(etag):
+    """Return the version part of an ETag issued by ``make_etag``."""
+    return _strip_weak(etag).strip('"').split('-', 1)[0]
+
+
+def make_etag(request, version=None):
+    """Return a strong ETag for the response to a read request."""
+    renderer = getattr(request, 'accepted_renderer', None)
+    params = sorted(request.query_params.lists())
+    digest = hashlib.md5(repr((
+        request.path,
+        params,
+        renderer.format if renderer else None,
+    )).encode()).hexdigest()
+    if version is None:
+        version = request_version(request)
+    return f'"{version}-{digest}"'
+
+
+class ConditionalMixin:
+    """Answer If-None-Match with 304 and enforce If-Match on updates."""
+
+    def _conditional_read(self, handler, request, *args, **kwargs):
+        etag = make_etag(request)
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            tags = parse_etags(if_none_match)
+            if etag in {_strip_weak(tag) for tag in tags}:
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+                response['ETag'] = etag
+                return response
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional_read(
+            super().list, request, *args, **kwargs
+        )
+
+    def update(self, request, *args, **kwargs):
+        if_match = request.headers.get('If-Match')
+        with transaction.atomic():
+            if if_match:
+                # any representation of the current version satisfies the
+                # precondition, since the version covers every object a
+                # user has; the lock keeps it current until the update
+                # commits
+                version = str(lock_user_version(request.user.pk))
+                tags = parse_etags(if_match)
+                if '*' not in tags and (
+                        version not in map(_version_of, tags)):
+                    raise PreconditionFailed()
+            response = super().update(request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                # the version the update moved to, so clients can chain
+                # conditional updates without reading the object again
+                response['ETag'] = make_etag(
+                    request, lock_user_version(request.user.pk),
+                )
+        return response
+
+
+class ConditionalRetrieveMixin(ConditionalMixin):
+    """Also answer If-None-Match on the detail route."""
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional_read(
+            super().retrieve, request, *args, **kwargs
+        )
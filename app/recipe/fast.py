@@ -0,0 +1,123 @@
+"""
+Fast read path for recipe lists.
+
+Builds the same JSON shape as ``RecipeSerializer`` straight from ``values()``
+rows and lightweight records, skipping per-instance serializer field
+construction.
+"""
+
+from decimal import Decimal
+
+from django.conf import settings
+
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from core.models import Recipe
+from recipe.serializers import (
+    RecipeSerializer,
+    requested_fields,
+)
+
+
+NESTED_FIELDS = ('tags', 'ingredients')
+PRICE_PLACES = Decimal('0.01')
+
+
+class NestedRecord:
+    """A tag or ingredient attached to a recipe."""
+    __slots__ = ('id', 'name')
+
+    def __init__(self, id, name):
+        self.id = id
+        self.name = name
+
+    def to_dict(self):
+        return {'id': self.id, 'name': self.name}
+
+
+class RecipeRecord:
+    """A recipe row with its nested tags and ingredients."""
+    __slots__ = (
+        'id', 'title', 'time_minutes', 'price', 'link', 'description',
+        'tags', 'ingredients',
+    )
+
+    def __init__(self, row):
+        for name in self.__slots__:
+            setattr(self, name, row.get(name))
+        self.tags = []
+        self.ingredients = []
+
+    def to_dict(self, fields):
+        data = {}
+        for name in fields:
+            value = getattr(self, name)
+            if name == 'price':
+                value = format_price(value)
+            elif name in NESTED_FIELDS:
+                value = [item.to_dict() for item in value]
+            data[name] = value
+        return data
+
+
+def format_price(value):
+    """Render a price the way DRF's ``DecimalField`` does."""
+    if value is None:
+        return None
+    value = value.quantize(PRICE_PLACES)
+    if api_settings.COERCE_DECIMAL_TO_STRING:
+        return '{:f}'.format(value)
+    return value
+
+
+def _attach_nested(records, name):
+    """Load one nested relation for all records in a single query."""
+    field = getattr(Recipe, name).field
+    through = field.remote_field.through
+    target = field.m2m_reverse_field_name()
+    by_id = {record.id: record for record in records}
+    rows = through.objects.filter(
+        recipe_id__in=list(by_id),
+    ).values_list('recipe_id', target, f'{target}__name')
+    for recipe_id, item_id, item_name in rows:
+        getattr(by_id[recipe_id], name).append(
+            NestedRecord(item_id, item_name)
+        )
+
+
+def recipe_values(queryset, fields):
+    """Return a ``values()`` queryset with the columns for ``fields``."""
+    columns = [name for name in fields if name not in NESTED_FIELDS]
+    # keep annotations such as the search rank for cursor pagination
+    annotations = list(queryset.query.annotations)
+    return queryset.prefetch_related(None).values(
+        'id', *columns, *annotations
+    )
+
+
+def serialize_recipes(rows, fields):
+    """Serialize ``values()`` rows to the ``RecipeSerializer`` shape."""
+    records = [RecipeRecord(row) for row in rows]
+    for name in NESTED_FIELDS:
+        if name in fields and records:
+            _attach_nested(records, name)
+    return [record.to_dict(fields) for record in records]
+
+
+class FastRecipeListMixin:
+    """Serve recipe lists through the fast path when it is enabled."""
+
+    def list(self, request, *args, **kwargs):
+        if not settings.RECIPE_FAST_SERIALIZER:
+            return super().list(request, *args, **kwargs)
+
+        fields = requested_fields(request, RecipeSerializer.Meta.fields)
+        queryset = recipe_values(
+            self.filter_queryset(self.get_queryset()),
+            fields,
+        )
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(serialize_recipes(queryset, fields))
+        return self.get_paginated_response(serialize_recipes(page, fields))
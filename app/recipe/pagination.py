@@ -0,0 +1,25 @@
+"""
+Pagination classes for the recipe APIs.
+"""
+
+from django.conf import settings
+
+from rest_framework.pagination import CursorPagination
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Keyset pagination over recipes ordered by descending id.
+
+    The cursor is opaque to clients and encodes the last id seen, so each
+    page is fetched with an ``id < cursor`` seek instead of an OFFSET.
+    Search results are paged by rank instead, falling back to id for ties.
+    """
+    ordering = '-id'
+    page_size = settings.RECIPE_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.RECIPE_MAX_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        if 'rank' in queryset.query.annotations:
+            return ('-rank', '-id')
+        return super().get_ordering(request, queryset, view)
@@ -1,10 +1,162 @@
 """Serializers for recipe APIs"""
 
+from django.db import transaction
+from django.db.models import Value
+from django.db.models.functions import Lower
+
 from rest_framework import serializers
 
 from core.models import (Recipe, Tag, Ingredient)
+from recipe.cache import invalidate_user
+
+
+def _split_param(value):
+    """Split a comma separated query param into a set of names."""
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def requested_fields(request, available):
+    """Return the names in ``available`` selected by ``fields``/``omit``."""
+    selected = list(available)
+    if request is None:
+        return selected
+    fields = request.query_params.get('fields')
+    omit = request.query_params.get('omit')
+    if fields:
+        keep = _split_param(fields)
+        selected = [name for name in selected if name in keep]
+    if omit:
+        drop = _split_param(omit)
+        selected = [name for name in selected if name not in drop]
+    return selected
+
+
+def _by_names(model, user, names):
+    """Return ``{name: obj}`` for the user's rows matching ``names``.
+
+    Names are compared with Postgres ``lower()``, the function behind the
+    unique index, since Python's ``str.lower()`` disagrees with it for
+    some inputs such as a final sigma.
+    """
+    rows = model.objects.raw(
+        f'SELECT t.*, v.input FROM {model._meta.db_table} t '
+        f'JOIN unnest(%s::text[]) AS v(input) '
+        f'ON lower(t.name) = lower(v.input) '
+        f'WHERE t.user_id = %s',
+        [names, user.pk],
+    )
+    return {row.input: row for row in rows}
+
+
+def resolve_by_name(model, user, names):
+    """Return ``{name: obj}`` for ``names``, creating missing rows.
+
+    Names match case-insensitively. Missing rows are inserted with
+    ``ON CONFLICT DO NOTHING`` against the unique ``(user, lower(name))``
+    index, so a concurrent insert of the same name, or another spelling
+    of it in ``names``, is simply picked up by the follow-up select
+    instead of raising or needing a retry.
+    """
+    names = list(dict.fromkeys(names))
+    if not names:
+        return {}
+    found = _by_names(model, user, names)
+    missing = [name for name in names if name not in found]
+    if missing:
+        model.objects.bulk_create(
+            [model(user=user, name=name) for name in missing],
+            ignore_conflicts=True,
+        )
+        found.update(_by_names(model, user, missing))
+    return found
+
+
+def bulk_create_recipes(user, items):
+    """Create recipes and their nested tags and ingredients set-wise.
+
+    ``items`` are validated recipe payloads. Tags and ingredients for the
+    whole batch are resolved together and each through table is written
+    with a single INSERT.
+    """
+    items = [dict(item) for item in items]
+    nested = [
+        (item.pop('tags', []), item.pop('ingredients', []))
+        for item in items
+    ]
+    tag_names = [t['name'] for item_tags, _ in nested for t in item_tags]
+    ingredient_names = [
+        i['name'] for _, item_ingredients in nested for i in item_ingredients
+    ]
+    with transaction.atomic():
+        tags = resolve_by_name(Tag, user, tag_names)
+        ingredients = resolve_by_name(Ingredient, user, ingredient_names)
+        recipes = Recipe.objects.bulk_create(
+            Recipe(user=user, **item) for item in items
+        )
+        tag_links = set()
+        ingredient_links = set()
+        for recipe, (item_tags, item_ingredients) in zip(recipes, nested):
+            tag_links.update(
+                (recipe.id, tags[t['name']].id) for t in item_tags
+            )
+            ingredient_links.update(
+                (recipe.id, ingredients[i['name']].id)
+                for i in item_ingredients
+            )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id, tag_id in sorted(tag_links)
+        )
+        Recipe.ingredients.through.objects.bulk_create(
+            Recipe.ingredients.through(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_id,
+            )
+            for recipe_id, ingredient_id in sorted(ingredient_links)
+        )
+        # bulk writes skip model signals, so invalidate explicitly
+        invalidate_user(user.id)
+    return recipes
+
 
-class TagSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """Only render the fields requested with ``?fields=`` or ``?omit=``."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        # only trim read responses so writes still validate every field
+        if request is None or request.method not in ('GET', 'HEAD'):
+            return
+        selected = set(requested_fields(request, self.fields))
+        for name in list(self.fields):
+            if name not in selected:
+                self.fields.pop(name)
+
+
+class UniqueNameMixin:
+    """Reject renaming an object to a name the user already has."""
+
+    def validate_name(self, value):
+        # nested payloads link to existing names, so only check renames
+        if self.instance is None:
+            return value
+        clash = type(self.instance).objects.annotate(
+            name_key=Lower('name'),
+        ).filter(
+            user=self.instance.user_id,
+            name_key=Lower(Value(value)),
+        ).exclude(id=self.instance.id)
+        if clash.exists():
+            raise serializers.ValidationError(
+                'An item with this name already exists.'
+            )
+        return value
+
+
+class TagSerializer(UniqueNameMixin,
+                    SparseFieldsMixin,
+                    serializers.ModelSerializer):
     """Serializer for tags"""
 
     class Meta:
@@ -12,14 +164,16 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ['id', 'name']
         read_only_fields = ['id']
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(UniqueNameMixin,
+                           SparseFieldsMixin,
+                           serializers.ModelSerializer):
     """Serializer for ingredients"""
     class Meta:
         model = Ingredient
         fields = ['id', 'name']
         read_only_fields = ['id']
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for recipes."""
     tags = TagSerializer(many=True, required=False)
     ingredients = IngredientSerializer(many=True, required=False)
@@ -32,48 +186,83 @@ class RecipeSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id']
 
-    def _get_or_create_tags(self, tags, recipe):
+    def _get_or_create_tags(self, tags):
         """Handling getting or creating tags"""
         auth_user = self.context['request'].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user, 
-                **tag
-            )
-            recipe.tags.add(tag_obj)
+        names = [tag['name'] for tag in tags]
+        return resolve_by_name(Tag, auth_user, names).values()
 
-    def _get_or_create_ingredients(self, ingredients, recipe):
+    def _get_or_create_ingredients(self, ingredients):
         """Handling getting or creating ingredients"""
         auth_user = self.context['request'].user
-        for ingredient in ingredients:
-            ingredient_obj, created = Ingredient.objects.get_or_create(
-                user=auth_user, 
-                **ingredient
-            )
-            recipe.ingredients.add(ingredient_obj)
+        names = [ingredient['name'] for ingredient in ingredients]
+        return resolve_by_name(Ingredient, auth_user, names).values()
+
+    def _through(self, name):
+        """Return the through model and related id column of a relation."""
+        field = getattr(Recipe, name).field
+        return (
+            field.remote_field.through,
+            f'{field.m2m_reverse_field_name()}_id',
+        )
+
+    def _add_links(self, recipe, name, objs):
+        """Link a new recipe to ``objs`` with a single INSERT."""
+        through, column = self._through(name)
+        through.objects.bulk_create(
+            through(recipe_id=recipe.id, **{column: related_id})
+            for related_id in sorted({obj.id for obj in objs})
+        )
+
+    def _sync_links(self, recipe, name, objs):
+        """Make a relation match ``objs``, writing only what changed."""
+        through, column = self._through(name)
+        links = through.objects.filter(recipe_id=recipe.id)
+        current = set(links.values_list(column, flat=True))
+        wanted = {obj.id for obj in objs}
+        stale = current - wanted
+        if stale:
+            links.filter(**{f'{column}__in': stale}).delete()
+        through.objects.bulk_create(
+            through(recipe_id=recipe.id, **{column: related_id})
+            for related_id in sorted(wanted - current)
+        )
+        # drop any prefetched rows so the response reflects the change
+        getattr(recipe, '_prefetched_objects_cache', {}).pop(name, None)
 
     # overwrite the create method to customize the create functionalities of recipes with nest tags
+    @transaction.atomic
     def create(self, validated_data):
         """Create a recipe"""
         tags = validated_data.pop('tags', [])
         ingredients = validated_data.pop('ingredients', [])
         recipe = Recipe.objects.create(**validated_data)
-        self._get_or_create_tags(tags, recipe)
-        self._get_or_create_ingredients(ingredients, recipe)
-        
+        self._add_links(recipe, 'tags', self._get_or_create_tags(tags))
+        self._add_links(
+            recipe,
+            'ingredients',
+            self._get_or_create_ingredients(ingredients),
+        )
+
         return recipe
-    
+
+    @transaction.atomic
     def update(self, instance, validated_data):
         """update recipe."""
         tags = validated_data.pop('tags', None)
         ingredients = validated_data.pop('ingredients', None)
-        # overwrite the previous tags and update with validated data (new tags)
+        # replace the previous tags with validated data (new tags), only
+        # deleting and inserting the links that differ
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            self._sync_links(
+                instance, 'tags', self._get_or_create_tags(tags)
+            )
         if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
+            self._sync_links(
+                instance,
+                'ingredients',
+                self._get_or_create_ingredients(ingredients),
+            )
 
         # assign other values into instances
         for attr, value in validated_data.items():
@@ -0,0 +1,47 @@
+"""
+Signal handlers that keep the recipe response cache consistent.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+from recipe.cache import (
+    invalidate_user,
+    skip_deleted_user,
+)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_on_write(sender, instance, **kwargs):
+    """Bump the owner's data version when an object changes."""
+    invalidate_user(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_on_m2m_change(sender, instance, action, **kwargs):
+    """Bump the owner's data version when recipe relations change."""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_user(instance.user_id)
+
+
+@receiver(pre_delete, sender=get_user_model())
+def skip_versions_of_deleted_user(sender, instance, **kwargs):
+    """Skip the bumps of everything a user deletion cascades to."""
+    skip_deleted_user(instance.pk)
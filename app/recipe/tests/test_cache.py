@@ -0,0 +1,184 @@
+"""
+Tests for the recipe response cache.
+"""
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import (
+    TestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    DataVersion,
+    Recipe,
+    Tag,
+    Ingredient,
+)
+from recipe import cache
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    """Create and return a recipe detail URL."""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'Sample recipe title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class RecipeCacheTests(TestCase):
+    """Test the versioned recipe list cache."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        cache.get_cache().clear()
+        cache.stats.reset()
+
+    def test_second_list_served_from_cache(self):
+        """Test a repeated list request only reads the data version."""
+        create_recipe(user=self.user)
+        res1 = self.client.get(RECIPES_URL)
+
+        with self.assertNumQueries(1):
+            res2 = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res2.status_code, status.HTTP_200_OK)
+        self.assertEqual(res1.data, res2.data)
+        self.assertEqual(cache.stats.as_dict(), {'hits': 1, 'misses': 1})
+
+    def test_query_params_cached_separately(self):
+        """Test different query params use different cache entries."""
+        create_recipe(user=self.user)
+        self.client.get(RECIPES_URL)
+
+        res = self.client.get(RECIPES_URL, {'fields': 'id'})
+
+        self.assertEqual(list(res.data['results'][0]), ['id'])
+        self.assertEqual(cache.stats.as_dict(), {'hits': 0, 'misses': 2})
+
+    def test_api_write_invalidates_cache(self):
+        """Test updating a recipe through the API invalidates the list."""
+        recipe = create_recipe(user=self.user)
+        self.client.get(RECIPES_URL)
+
+        self.client.patch(detail_url(recipe.id), {'title': 'New title'})
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data['results'][0]['title'], 'New title')
+
+    def test_m2m_change_invalidates_cache(self):
+        """Test adding a tag outside the API invalidates the list."""
+        recipe = create_recipe(user=self.user)
+        self.client.get(RECIPES_URL)
+
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Spicy'))
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data['results'][0]['tags'][0]['name'], 'Spicy')
+
+    def test_ingredient_rename_invalidates_cache(self):
+        """Test renaming an ingredient invalidates the list."""
+        recipe = create_recipe(user=self.user)
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        recipe.ingredients.add(ingredient)
+        self.client.get(RECIPES_URL)
+
+        ingredient.name = 'Sea salt'
+        ingredient.save()
+        res = self.client.get(RECIPES_URL)
+
+        ingredients = res.data['results'][0]['ingredients']
+        self.assertEqual(ingredients[0]['name'], 'Sea salt')
+
+    def test_version_scoped_to_user(self):
+        """Test a write by one user does not invalidate another's cache."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+        version = cache.get_user_version(self.user.id)
+
+        create_recipe(user=other)
+
+        self.assertEqual(cache.get_user_version(self.user.id), version)
+        self.assertNotEqual(cache.get_user_version(other.id), version)
+
+    def test_write_through_other_cache_invalidates(self):
+        """Test a write by a process with its own cache is seen here."""
+        create_recipe(user=self.user)
+        self.client.get(RECIPES_URL)
+        other_process = {
+            **settings.CACHES,
+            'recipes': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'other-process',
+            },
+        }
+
+        with override_settings(CACHES=other_process):
+            create_recipe(user=self.user, title='Written elsewhere')
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data['results'][0]['title'], 'Written elsewhere')
+        self.assertEqual(cache.stats.as_dict(), {'hits': 0, 'misses': 2})
+
+    def test_version_bumped_once_per_transaction(self):
+        """Test writes in one transaction bump the version once."""
+        version = cache.get_user_version(self.user.id)
+
+        with transaction.atomic():
+            for i in range(3):
+                create_recipe(user=self.user, title=f'Recipe {i}')
+
+        self.assertEqual(cache.get_user_version(self.user.id), version + 1)
+
+    def test_version_read_between_writes_bumps_again(self):
+        """Test a write after the version was read bumps it again."""
+        with transaction.atomic():
+            create_recipe(user=self.user)
+            version = cache.get_user_version(self.user.id)
+            create_recipe(user=self.user)
+
+            self.assertEqual(
+                cache.get_user_version(self.user.id), version + 1,
+            )
+
+    def test_user_delete_skips_version_bumps(self):
+        """Test deleting a user does not bump once per deleted object."""
+        for i in range(3):
+            recipe = create_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.tags.add(Tag.objects.create(user=self.user, name=f'T{i}'))
+        user_id = self.user.id
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.user.delete()
+
+        upserts = [
+            query for query in ctx.captured_queries
+            if query['sql'].lstrip().startswith('INSERT INTO core_dataversion')
+        ]
+        self.assertEqual(upserts, [])
+        self.assertFalse(DataVersion.objects.filter(user_id=user_id).exists())
@@ -0,0 +1,171 @@
+"""
+Tests for conditional requests on the recipe APIs.
+"""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag,
+)
+from recipe import cache
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    """Create and return a recipe detail URL."""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'Sample recipe title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class ConditionalRequestTests(TestCase):
+    """Test ETag based conditional requests."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_not_modified_with_one_query(self):
+        """Test a matching If-None-Match only reads the data version."""
+        create_recipe(user=self.user)
+        res = self.client.get(RECIPES_URL)
+        etag = res['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_etag_changes_after_write(self):
+        """Test a write makes the previous ETag stale."""
+        res = self.client.get(RECIPES_URL)
+        etag = res['ETag']
+
+        create_recipe(user=self.user)
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_etag_depends_on_query_params(self):
+        """Test different query params get different ETags."""
+        res1 = self.client.get(RECIPES_URL)
+        res2 = self.client.get(RECIPES_URL, {'fields': 'id'})
+
+        self.assertNotEqual(res1['ETag'], res2['ETag'])
+
+    def test_detail_not_modified(self):
+        """Test the detail route honours If-None-Match."""
+        recipe = create_recipe(user=self.user)
+        res = self.client.get(detail_url(recipe.id))
+
+        res = self.client.get(
+            detail_url(recipe.id),
+            HTTP_IF_NONE_MATCH=res['ETag'],
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_tags_not_modified(self):
+        """Test the tag list honours If-None-Match."""
+        Tag.objects.create(user=self.user, name='Vegan')
+        res = self.client.get(TAGS_URL)
+
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_update_with_current_if_match(self):
+        """Test a PATCH with a current ETag succeeds."""
+        recipe = create_recipe(user=self.user)
+        res = self.client.get(detail_url(recipe.id))
+
+        res = self.client.patch(
+            detail_url(recipe.id),
+            {'title': 'New title'},
+            HTTP_IF_MATCH=res['ETag'],
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'New title')
+
+    def test_update_with_stale_if_match_fails(self):
+        """Test a PATCH with a stale ETag is rejected."""
+        recipe = create_recipe(user=self.user)
+        res = self.client.get(detail_url(recipe.id))
+        etag = res['ETag']
+        self.client.patch(detail_url(recipe.id), {'title': 'Other edit'})
+
+        res = self.client.patch(
+            detail_url(recipe.id),
+            {'title': 'Lost update'},
+            HTTP_IF_MATCH=etag,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'Other edit')
+
+    def test_update_returns_etag_for_chaining(self):
+        """Test a PATCH returns the new ETag for the next conditional write."""
+        recipe = create_recipe(user=self.user)
+        res = self.client.get(detail_url(recipe.id))
+
+        res = self.client.patch(
+            detail_url(recipe.id),
+            {'title': 'First'},
+            HTTP_IF_MATCH=res['ETag'],
+        )
+        etag = res['ETag']
+        res = self.client.patch(
+            detail_url(recipe.id),
+            {'title': 'Second'},
+            HTTP_IF_MATCH=etag,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res = self.client.get(
+            detail_url(recipe.id),
+            HTTP_IF_NONE_MATCH=res['ETag'],
+        )
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_stale_after_write_without_signals(self):
+        """Test a version bump by another process makes the ETag stale."""
+        res = self.client.get(RECIPES_URL)
+        etag = res['ETag']
+
+        # what a management command loading rows with COPY does
+        Recipe.objects.bulk_create([Recipe(
+            user=self.user, title='Copied', time_minutes=5, price='1.00',
+        )])
+        cache.invalidate_user(self.user.id)
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['title'], 'Copied')
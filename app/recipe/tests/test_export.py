@@ -0,0 +1,212 @@
+"""
+Tests for the streaming recipe export.
+"""
+
+import gzip
+import json
+import threading
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+from recipe.export import accepts_gzip
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+class RecipeExportTests(TestCase):
+    """Test exporting all recipes of a user."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        tag = Tag.objects.create(user=self.user, name='Dinner')
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        for i in range(5):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                time_minutes=10,
+                price=Decimal('2.50'),
+                description='Tasty',
+            )
+            recipe.tags.add(tag)
+            recipe.ingredients.add(ingredient)
+
+    def _content(self, res):
+        return b''.join(res.streaming_content)
+
+    def test_export_json_array(self):
+        """Test the export is a JSON array of every recipe in id order."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+        Recipe.objects.create(
+            user=other, title='Hidden', time_minutes=1, price='1.00',
+        )
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/json')
+        data = json.loads(self._content(res))
+        self.assertEqual(
+            [item['title'] for item in data],
+            [f'Recipe {i}' for i in range(5)],
+        )
+        self.assertEqual(data[0]['price'], '2.50')
+        self.assertEqual(data[0]['description'], 'Tasty')
+        self.assertEqual(data[0]['tags'][0]['name'], 'Dinner')
+        self.assertEqual(data[0]['ingredients'][0]['name'], 'Salt')
+
+    def test_export_ndjson(self):
+        """Test NDJSON export has one recipe per line."""
+        res = self.client.get(EXPORT_URL, HTTP_ACCEPT='application/x-ndjson')
+
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        lines = self._content(res).splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[0])['title'], 'Recipe 0')
+
+    def test_export_empty(self):
+        """Test exporting with no recipes gives an empty array."""
+        Recipe.objects.all().delete()
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(json.loads(self._content(res)), [])
+
+    def test_export_gzip(self):
+        """Test the export is compressed when the client accepts gzip."""
+        res = self.client.get(EXPORT_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        data = json.loads(gzip.decompress(self._content(res)))
+        self.assertEqual(len(data), 5)
+
+    def test_export_gzip_refused(self):
+        """Test the export is not compressed when gzip has q=0."""
+        res = self.client.get(EXPORT_URL, HTTP_ACCEPT_ENCODING='gzip;q=0')
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+        self.assertEqual(len(json.loads(self._content(res))), 5)
+
+    @override_settings(RECIPE_EXPORT_CHUNK_SIZE=2)
+    def test_nested_loaded_once_per_chunk(self):
+        """Test tags and ingredients take one query per chunk each."""
+        res = self.client.get(EXPORT_URL)
+
+        with CaptureQueriesContext(connection) as queries:
+            data = json.loads(self._content(res))
+
+        self.assertEqual(len(data), 5)
+        tag_queries = [
+            query for query in queries.captured_queries
+            if 'core_recipe_tags' in query['sql']
+        ]
+        # three chunks of at most two recipes
+        self.assertEqual(len(tag_queries), 3)
+
+
+class AcceptsGzipTests(SimpleTestCase):
+    """Test parsing Accept-Encoding for gzip."""
+
+    def test_accepts_gzip(self):
+        cases = [
+            ('gzip', True),
+            ('deflate, GZIP', True),
+            ('gzip;q=0.5, br', True),
+            ('*', True),
+            ('', False),
+            ('br', False),
+            ('gzip;q=0', False),
+            ('gzip; q=0.000', False),
+            ('*, gzip;q=0', False),
+            ('x-gzipped', False),
+            ('gzip;q=bad', False),
+        ]
+        for header, expected in cases:
+            with self.subTest(header=header):
+                self.assertEqual(accepts_gzip(header), expected)
+
+
+class RecipeExportSnapshotTests(TransactionTestCase):
+    """Test the export reads a consistent snapshot."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for i in range(3):
+            Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                time_minutes=10,
+                price=Decimal('2.50'),
+            )
+
+    def _edit_elsewhere(self):
+        """Change the recipes in a committed transaction of another thread."""
+        def edit():
+            try:
+                Recipe.objects.filter(user=self.user).update(title='Changed')
+                Recipe.objects.create(
+                    user=self.user,
+                    title='Added',
+                    time_minutes=1,
+                    price=Decimal('1.00'),
+                )
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=edit)
+        thread.start()
+        thread.join()
+
+    @override_settings(RECIPE_EXPORT_CHUNK_SIZE=1)
+    def test_export_ignores_concurrent_edits(self):
+        """Test edits committed mid export do not show up in it."""
+        res = self.client.get(EXPORT_URL)
+        content = iter(res.streaming_content)
+
+        with CaptureQueriesContext(connection) as queries:
+            # the opening bracket and the first chunk start the snapshot
+            parts = [next(content), next(content)]
+            self._edit_elsewhere()
+            parts.extend(content)
+
+        self.assertIn(
+            'SET TRANSACTION ISOLATION LEVEL REPEATABLE READ',
+            queries.captured_queries[0]['sql'],
+        )
+        data = json.loads(b''.join(parts))
+        self.assertEqual(
+            [item['title'] for item in data],
+            [f'Recipe {i}' for i in range(3)],
+        )
+        self.assertEqual(Recipe.objects.filter(title='Changed').count(), 3)
@@ -0,0 +1,102 @@
+"""
+Tests for the fast recipe list read path.
+"""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import (
+    TestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+from recipe import (
+    cache,
+    fast,
+)
+from recipe.serializers import RecipeSerializer
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def sort_nested(data):
+    """Sort nested tags and ingredients by id for comparison."""
+    for item in data:
+        for name in fast.NESTED_FIELDS:
+            if name in item:
+                item[name] = sorted(item[name], key=lambda n: n['id'])
+    return data
+
+
+class FastSerializerTests(TestCase):
+    """Test the fast path matches RecipeSerializer output."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        for i in range(3):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                time_minutes=10 + i,
+                price=Decimal('4.5'),
+                link='http://example.com/recipe.pdf',
+            )
+            for j in range(i):
+                recipe.tags.add(
+                    Tag.objects.create(user=self.user, name=f'Tag {i}{j}')
+                )
+            recipe.ingredients.add(
+                Ingredient.objects.create(user=self.user, name=f'Ing {i}')
+            )
+        self.queryset = Recipe.objects.filter(user=self.user).order_by('-id')
+
+    def test_output_matches_model_serializer(self):
+        """Test the fast path renders the same data as the serializer."""
+        fields = RecipeSerializer.Meta.fields
+        expected = RecipeSerializer(self.queryset, many=True).data
+
+        rows = fast.recipe_values(self.queryset, fields)
+        data = fast.serialize_recipes(rows, fields)
+
+        self.assertEqual(
+            sort_nested(data),
+            sort_nested([dict(item) for item in expected]),
+        )
+        self.assertEqual(data[0]['price'], '4.50')
+
+    def test_nested_loaded_in_constant_queries(self):
+        """Test nested relations cost one query each."""
+        fields = RecipeSerializer.Meta.fields
+        rows = list(fast.recipe_values(self.queryset, fields))
+
+        with self.assertNumQueries(2):
+            fast.serialize_recipes(rows, fields)
+
+    def test_api_list_matches_with_fast_path(self):
+        """Test the list endpoint output is unchanged by the fast path."""
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        with override_settings(RECIPE_FAST_SERIALIZER=False):
+            expected = client.get(RECIPES_URL, {'omit': 'link'})
+        cache.get_cache().clear()
+        with override_settings(RECIPE_FAST_SERIALIZER=True):
+            res = client.get(RECIPES_URL, {'omit': 'link'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sort_nested(res.json()['results']),
+            sort_nested(expected.json()['results']),
+        )
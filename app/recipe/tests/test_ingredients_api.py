@@ -94,9 +94,11 @@ class PrivateIngredientsApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(Ingredient.objects.filter(user=self.user).exists())
 
-    
+    def test_retrieve_ingredients_omit_fields(self):
+        """Test ingredient fields can be omitted from the list."""
+        ingredient = Ingredient.objects.create(user=self.user, name='Kale')
 
-        
+        res = self.client.get(INGREDIENTS_URL, {'omit': 'name'})
 
-
-            
\ No newline at end of file
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [{'id': ingredient.id}])
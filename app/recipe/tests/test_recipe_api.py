@@ -3,9 +3,20 @@ Tests for recipe APIs.
 """
 
 from decimal import Decimal
+from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
+from django.db import (
+    connection,
+    IntegrityError,
+    transaction,
+)
+from django.db.models import (
+    Exists,
+    OuterRef,
+)
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
@@ -17,12 +28,14 @@ from core.models import (
     Ingredient
 )
 
+from recipe.pagination import RecipeCursorPagination
 from recipe.serializers import (
     RecipeSerializer,
     RecipeDetailSerializer,
 )
 
 RECIPES_URL = reverse('recipe:recipe-list')
+BULK_URL = reverse('recipe:recipe-bulk-create')
 
 
 def detail_url(recipe_id):
@@ -79,7 +92,7 @@ class PrivateRecipeAPITests(TestCase):
         recipes = Recipe.objects.all().order_by('-id')
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertTrue(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipe_list_limited_to_user(self):
         """Test list of recipes is limited to authenticated user."""
@@ -95,7 +108,7 @@ class PrivateRecipeAPITests(TestCase):
         recipes = Recipe.objects.filter(user=self.user)
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_get_recipe_detail(self):
         """Test get recipe detail."""
@@ -387,4 +400,515 @@ class PrivateRecipeAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(recipe.ingredients.count(), 0)
 
-    
+    def test_list_recipes_query_count_is_constant(self):
+        """Test listing recipes does not query once per recipe."""
+        for i in range(5):
+            recipe = create_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f'Tag {i}')
+            )
+            recipe.ingredients.add(
+                Ingredient.objects.create(user=self.user, name=f'Ing {i}')
+            )
+
+        # the data version, recipes and one each for prefetched tags and
+        # ingredients
+        with self.assertNumQueries(4):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 5)
+        for item in res.data['results']:
+            self.assertEqual(len(item['tags']), 1)
+            self.assertEqual(len(item['ingredients']), 1)
+
+    def test_get_recipe_detail_query_count(self):
+        """Test recipe detail fetches nested data in a fixed query count."""
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Salt')
+        )
+
+        # the data version for the ETag, recipe and two prefetches
+        with self.assertNumQueries(4):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'][0]['name'], 'Vegan')
+        self.assertEqual(res.data['ingredients'][0]['name'], 'Salt')
+
+    def test_list_recipes_paginated_by_cursor(self):
+        """Test recipes are paged newest first using an opaque cursor."""
+        recipes = [
+            create_recipe(user=self.user, title=f'Recipe {i}')
+            for i in range(5)
+        ]
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r['id'] for r in res.data['results']],
+            [recipes[4].id, recipes[3].id],
+        )
+        self.assertIsNone(res.data['previous'])
+
+        res = self.client.get(res.data['next'])
+
+        self.assertEqual(
+            [r['id'] for r in res.data['results']],
+            [recipes[2].id, recipes[1].id],
+        )
+
+        res = self.client.get(res.data['next'])
+
+        self.assertEqual(
+            [r['id'] for r in res.data['results']],
+            [recipes[0].id],
+        )
+        self.assertIsNone(res.data['next'])
+
+    def test_list_recipes_page_uses_seek_not_offset(self):
+        """Test later pages filter on id instead of using OFFSET."""
+        for i in range(3):
+            create_recipe(user=self.user, title=f'Recipe {i}')
+        res = self.client.get(RECIPES_URL, {'page_size': 1})
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(res.data['next'])
+
+        # the first query reads the data version
+        recipe_sql = ctx.captured_queries[1]['sql']
+        self.assertIn('"core_recipe"."id" <', recipe_sql)
+        self.assertNotIn('OFFSET', recipe_sql)
+
+    def test_list_recipes_page_size_capped(self):
+        """Test the requested page size cannot exceed the maximum."""
+        for i in range(3):
+            create_recipe(user=self.user, title=f'Recipe {i}')
+
+        with patch.object(RecipeCursorPagination, 'max_page_size', 2):
+            res = self.client.get(RECIPES_URL, {'page_size': 50})
+
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_list_recipes_sparse_fields(self):
+        """Test only the requested fields are rendered and loaded."""
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Quick'))
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(
+                RECIPES_URL,
+                {'fields': 'id,title,time_minutes'},
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['results'],
+            [{
+                'id': recipe.id,
+                'title': recipe.title,
+                'time_minutes': recipe.time_minutes,
+            }],
+        )
+        # the data version, then no prefetch queries and no unused columns
+        self.assertEqual(len(ctx.captured_queries), 2)
+        sql = ctx.captured_queries[1]['sql']
+        self.assertNotIn('"core_recipe"."price"', sql)
+
+    def test_list_recipes_omit_fields(self):
+        """Test omitted fields are dropped from the response."""
+        create_recipe(user=self.user)
+
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPES_URL, {'omit': 'ingredients,link'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            set(res.data['results'][0]),
+            {'id', 'title', 'time_minutes', 'price', 'tags'},
+        )
+
+    def test_get_recipe_detail_sparse_fields(self):
+        """Test sparse fields apply to the recipe detail view."""
+        recipe = create_recipe(user=self.user)
+
+        res = self.client.get(
+            detail_url(recipe.id),
+            {'fields': 'id,description'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data,
+            {'id': recipe.id, 'description': recipe.description},
+        )
+
+    def test_filter_by_tags(self):
+        """Test filtering recipes by any of the given tags."""
+        r1 = create_recipe(user=self.user, title='Thai Vegetable Curry')
+        r2 = create_recipe(user=self.user, title='Aubergine with Tahini')
+        r3 = create_recipe(user=self.user, title='Fish and chips')
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Vegetarian')
+        r1.tags.add(tag1)
+        r2.tags.add(tag1, tag2)
+
+        res = self.client.get(RECIPES_URL, {'tags': f'{tag1.id},{tag2.id}'})
+
+        ids = [recipe['id'] for recipe in res.data['results']]
+        # r2 matches both tags but is only returned once
+        self.assertEqual(ids, [r2.id, r1.id])
+        self.assertNotIn(r3.id, ids)
+
+    def test_filter_by_all_tags(self):
+        """Test filtering recipes that have all of the given tags."""
+        r1 = create_recipe(user=self.user, title='Vegan curry')
+        r2 = create_recipe(user=self.user, title='Vegan gluten free curry')
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Gluten free')
+        r1.tags.add(tag1)
+        r2.tags.add(tag1, tag2)
+
+        res = self.client.get(
+            RECIPES_URL,
+            {'tags': f'{tag1.id},{tag2.id}', 'match': 'all'},
+        )
+
+        ids = [recipe['id'] for recipe in res.data['results']]
+        self.assertEqual(ids, [r2.id])
+
+    def test_filter_by_tags_and_ingredients(self):
+        """Test tag and ingredient filters must both match."""
+        r1 = create_recipe(user=self.user, title='Posh Beans on Toast')
+        r2 = create_recipe(user=self.user, title='Chicken Cacciatore')
+        tag = Tag.objects.create(user=self.user, name='Dinner')
+        in1 = Ingredient.objects.create(user=self.user, name='Feta Cheese')
+        in2 = Ingredient.objects.create(user=self.user, name='Chicken')
+        r1.tags.add(tag)
+        r2.tags.add(tag)
+        r1.ingredients.add(in1)
+        r2.ingredients.add(in2)
+
+        res = self.client.get(
+            RECIPES_URL,
+            {'tags': f'{tag.id}', 'ingredients': f'{in1.id}'},
+        )
+
+        ids = [recipe['id'] for recipe in res.data['results']]
+        self.assertEqual(ids, [r1.id])
+
+    def test_filter_invalid_ids(self):
+        """Test non numeric filter IDs return an error."""
+        res = self.client.get(RECIPES_URL, {'tags': '1,abc'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_uses_exists_and_indexes(self):
+        """Test the tag filter is a semi-join answered from indexes."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        for i in range(3):
+            create_recipe(user=self.user, title=f'Recipe {i}').tags.add(tag)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(RECIPES_URL, {'tags': f'{tag.id}'})
+        # the first query reads the data version
+        sql = ctx.captured_queries[1]['sql']
+        self.assertIn('EXISTS', sql)
+        self.assertNotIn('DISTINCT', sql)
+
+        # leave a hash semi-join as the only plan, so the link table is
+        # searched by tag and only the (tag, recipe) index can serve it
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SET LOCAL enable_seqscan = off; '
+                'SET LOCAL enable_nestloop = off; '
+                'SET LOCAL enable_mergejoin = off'
+            )
+        plan = Recipe.objects.filter(
+            Exists(Recipe.tags.through.objects.filter(
+                recipe_id=OuterRef('pk'),
+                tag_id__in=[tag.id],
+            ))
+        ).explain()
+        self.assertNotIn('Seq Scan on core_recipe_tags', plan)
+        self.assertIn('core_recipetag_tag_recipe_idx', plan)
+
+    def test_search_recipes(self):
+        """Test searching recipes by title and description."""
+        r1 = create_recipe(
+            user=self.user,
+            title='Lentil soup',
+            description='Warming winter dish',
+        )
+        r2 = create_recipe(
+            user=self.user,
+            title='Winter salad',
+            description='Crunchy lentils on greens',
+        )
+        create_recipe(user=self.user, title='Pancakes', description='Sweet')
+        other = create_user(email='other@example.com', password='test123')
+        create_recipe(user=other, title='Lentil curry')
+
+        res = self.client.get(RECIPES_URL, {'search': 'lentils'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [recipe['id'] for recipe in res.data['results']]
+        # the title match ranks above the description match
+        self.assertEqual(ids, [r1.id, r2.id])
+
+    def test_search_paginates_by_rank(self):
+        """Test search results can be paged with the cursor."""
+        title_match = create_recipe(user=self.user, title='Tomato soup')
+        body_match = create_recipe(
+            user=self.user,
+            title='Bruschetta',
+            description='Ripe tomato on toast',
+        )
+
+        res = self.client.get(
+            RECIPES_URL,
+            {'search': 'tomato', 'page_size': 1},
+        )
+        self.assertEqual(res.data['results'][0]['id'], title_match.id)
+
+        res = self.client.get(res.data['next'])
+
+        self.assertEqual(
+            [recipe['id'] for recipe in res.data['results']],
+            [body_match.id],
+        )
+        self.assertIsNone(res.data['next'])
+
+    def test_search_vector_updated_on_save(self):
+        """Test editing a title keeps the search vector current."""
+        recipe = create_recipe(user=self.user, title='Beef stew')
+        recipe.title = 'Mushroom stew'
+        recipe.save()
+
+        res = self.client.get(RECIPES_URL, {'search': 'mushroom'})
+
+        ids = [recipe['id'] for recipe in res.data['results']]
+        self.assertEqual(ids, [recipe.id])
+
+    def test_bulk_create_recipes(self):
+        """Test creating several recipes with shared tags at once."""
+        Tag.objects.create(user=self.user, name='Dinner')
+        payload = [
+            {
+                'title': f'Recipe {i}',
+                'time_minutes': 10,
+                'price': '3.50',
+                'tags': [{'name': 'Dinner'}, {'name': f'Tag {i}'}],
+                'ingredients': [{'name': 'Salt'}],
+            }
+            for i in range(3)
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['created'], 3)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 4)
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(), 1
+        )
+        for result, item in zip(res.data['results'], payload):
+            recipe = Recipe.objects.get(id=result['id'])
+            self.assertEqual(recipe.title, item['title'])
+            self.assertEqual(recipe.tags.count(), 2)
+            self.assertEqual(recipe.ingredients.count(), 1)
+
+    def test_bulk_create_query_count_is_constant(self):
+        """Test bulk create does not query once per recipe or tag."""
+        payload = [
+            {
+                'title': f'Recipe {i}',
+                'time_minutes': 10,
+                'price': '3.50',
+                'tags': [{'name': f'Tag {i}'}, {'name': f'Other {i}'}],
+                'ingredients': [{'name': f'Ingredient {i}'}],
+            }
+            for i in range(10)
+        ]
+
+        # savepoint, select + upsert + select per relation, recipes, two
+        # through inserts, data version bump, release savepoint
+        with self.assertNumQueries(12):
+            res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_bulk_create_partial_failure(self):
+        """Test valid items are created and invalid ones reported."""
+        payload = [
+            {'title': 'Good', 'time_minutes': 10, 'price': '1.00'},
+            {'title': 'Missing time', 'price': '1.00'},
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(res.data['created'], 1)
+        self.assertEqual(res.data['failed'], 1)
+        self.assertIn('id', res.data['results'][0])
+        self.assertIn('time_minutes', res.data['results'][1]['errors'])
+        self.assertTrue(
+            Recipe.objects.filter(user=self.user, title='Good').exists()
+        )
+
+    def test_bulk_create_requires_list(self):
+        """Test the bulk endpoint rejects a single object."""
+        payload = {'title': 'Single', 'time_minutes': 10, 'price': '1.00'}
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_recipe_nested_query_count(self):
+        """Test nested tags and ingredients are written set-wise."""
+        Ingredient.objects.create(user=self.user, name='Ingredient 0')
+        payload = {
+            'title': 'Big stew',
+            'time_minutes': 120,
+            'price': Decimal('9.50'),
+            'tags': [{'name': 'Dinner'}, {'name': 'Winter'}],
+            # duplicates in the payload are only linked once
+            'ingredients': [
+                {'name': f'Ingredient {i % 30}'} for i in range(40)
+            ],
+        }
+
+        # savepoint, recipe insert, data version bump, select + upsert +
+        # select + link for tags and for ingredients, release savepoint,
+        # two queries to render
+        with self.assertNumQueries(14):
+            res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.tags.count(), 2)
+        self.assertEqual(recipe.ingredients.count(), 30)
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(), 30
+        )
+
+    def test_update_recipe_nested_query_count(self):
+        """Test replacing tags costs a fixed number of queries."""
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Old'))
+        payload = {'tags': [{'name': f'Tag {i}'} for i in range(20)]}
+
+        # savepoint for the view, recipe + two prefetches, savepoint,
+        # select + upsert + select tags, read links, delete + insert links,
+        # recipe update, data version bump, release savepoint, two queries
+        # to render, data version for the ETag, release savepoint
+        with self.assertNumQueries(18):
+            res = self.client.patch(
+                detail_url(recipe.id), payload, format='json'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['tags']), 20)
+        self.assertEqual(recipe.tags.count(), 20)
+
+    def test_update_tags_only_writes_changed_links(self):
+        """Test swapping one tag keeps the other links untouched."""
+        recipe = create_recipe(user=self.user)
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('Breakfast', 'Lunch', 'Dinner')
+        ]
+        recipe.tags.add(*tags[:2])
+        through = Recipe.tags.through
+        kept = through.objects.get(recipe=recipe, tag=tags[0])
+
+        payload = {'tags': [{'name': 'Dinner'}, {'name': 'Breakfast'}]}
+        res = self.client.patch(detail_url(recipe.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            {tag['name'] for tag in res.data['tags']},
+            {'Breakfast', 'Dinner'},
+        )
+        # the unchanged link is the same row, not a re-inserted one
+        self.assertTrue(through.objects.filter(id=kept.id).exists())
+        self.assertFalse(
+            through.objects.filter(recipe=recipe, tag=tags[1]).exists()
+        )
+
+    def test_update_same_tags_is_idempotent(self):
+        """Test re-sending the current tags in any order writes nothing."""
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(
+            Tag.objects.create(user=self.user, name='Breakfast'),
+            Tag.objects.create(user=self.user, name='Lunch'),
+        )
+        before = list(
+            Recipe.tags.through.objects.filter(recipe=recipe)
+            .order_by('id').values_list('id', flat=True)
+        )
+        payload = {'tags': [{'name': 'Lunch'}, {'name': 'Breakfast'}]}
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.patch(
+                detail_url(recipe.id), payload, format='json'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        link_writes = [
+            query['sql'] for query in ctx.captured_queries
+            if 'core_recipe_tags' in query['sql']
+            and query['sql'].startswith(('INSERT', 'DELETE'))
+        ]
+        self.assertEqual(link_writes, [])
+        after = list(
+            Recipe.tags.through.objects.filter(recipe=recipe)
+            .order_by('id').values_list('id', flat=True)
+        )
+        self.assertEqual(before, after)
+
+    def test_create_recipe_reuses_tag_ignoring_case(self):
+        """Test nested tag names match existing tags case-insensitively."""
+        tag = Tag.objects.create(user=self.user, name='Thai')
+        payload = {
+            'title': 'Green curry',
+            'time_minutes': 30,
+            'price': Decimal('6.00'),
+            'tags': [{'name': 'thai'}, {'name': 'THAI'}],
+        }
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(list(recipe.tags.all()), [tag])
+
+    def test_create_recipe_tag_name_lowered_by_database(self):
+        """Test names are matched the way the database lowers them."""
+        # Python lowers the final sigma to 'ς', Postgres to 'σ'
+        tag = Tag.objects.create(user=self.user, name='ΟΔΟΣ')
+        payload = {
+            'title': 'Street food',
+            'time_minutes': 15,
+            'price': Decimal('4.00'),
+            'tags': [{'name': 'ΟΔΟΣ'}, {'name': 'οδοσ'}],
+        }
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(list(recipe.tags.all()), [tag])
+
+    def test_duplicate_tag_name_rejected_by_database(self):
+        """Test the database refuses case-insensitive duplicate names."""
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                Tag.objects.create(user=self.user, name='VEGAN')
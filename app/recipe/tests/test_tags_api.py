@@ -84,6 +84,23 @@ class PrivateTagsApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         tags = Tag.objects.filter(user=self.user)
         self.assertFalse(tags.exists())
-    
-    
 
+    def test_retrieve_tags_sparse_fields(self):
+        """Test tags can be listed with only the requested fields."""
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.get(TAGS_URL, {'fields': 'name'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [{'name': 'Vegan'}])
+
+    def test_rename_tag_to_existing_name(self):
+        """Test renaming a tag to another tag's name is rejected."""
+        Tag.objects.create(user=self.user, name='Dessert')
+        tag = Tag.objects.create(user=self.user, name='After dinner')
+
+        res = self.client.patch(detail_url(tag.id), {'name': 'dessert'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'After dinner')
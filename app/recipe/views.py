@@ -2,32 +2,171 @@
 Views for the recipe APIs.
 """
 
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+)
+from django.db.models import (
+    Exists,
+    F,
+    FloatField,
+    OuterRef,
+)
+from django.db.models.functions import Cast
+
+from drf_spectacular.utils import (
+    extend_schema_view,
+    extend_schema,
+    OpenApiParameter,
+    OpenApiTypes,
+)
+
+from django.conf import settings
+
 from rest_framework import (
     viewsets,
     mixins,
+    status,
 )
-from rest_framework.authentication import TokenAuthentication
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
+from core.authentication import API_AUTHENTICATION_CLASSES
+from core.renderers import ORJSONRenderer
 from core.models import (
     Recipe,
     Tag,
     Ingredient
 )
+from core.routers import ReplicaReadMixin
 from recipe import serializers
+from recipe.cache import CachedListMixin
+from recipe.export import (
+    NDJSONRenderer,
+    export_response,
+)
+from recipe.conditional import (
+    ConditionalMixin,
+    ConditionalRetrieveMixin,
+)
+from recipe.fast import FastRecipeListMixin
+from recipe.pagination import RecipeCursorPagination
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+@extend_schema_view(
+    list=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'tags',
+                OpenApiTypes.STR,
+                description='Comma separated list of tag IDs to filter',
+            ),
+            OpenApiParameter(
+                'ingredients',
+                OpenApiTypes.STR,
+                description='Comma separated list of ingredient IDs to filter',
+            ),
+            OpenApiParameter(
+                'match',
+                OpenApiTypes.STR,
+                enum=['any', 'all'],
+                description='Match any (default) or all of the given IDs',
+            ),
+            OpenApiParameter(
+                'search',
+                OpenApiTypes.STR,
+                description='Full text search over title and description',
+            ),
+        ]
+    )
+)
+class RecipeViewSet(ReplicaReadMixin,
+                    ConditionalRetrieveMixin,
+                    CachedListMixin,
+                    FastRecipeListMixin,
+                    viewsets.ModelViewSet):
     """View for manage recipe APIs."""
     serializer_class = serializers.RecipeDetailSerializer
-    queryset = Recipe.objects.all()
-    authentication_classes = [TokenAuthentication]
+    queryset = Recipe.objects.defer('search_vector')
+    authentication_classes = API_AUTHENTICATION_CLASSES
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipeCursorPagination
+
+    nested_fields = ['tags', 'ingredients']
+
+    def _params_to_ints(self, name):
+        """Convert a comma separated list of IDs to a list of integers."""
+        value = self.request.query_params.get(name)
+        if not value:
+            return []
+        try:
+            return sorted({int(str_id) for str_id in value.split(',')})
+        except ValueError:
+            raise ValidationError({name: 'Expected comma separated IDs.'})
+
+    def _filter_related(self, queryset, name, column):
+        """Keep recipes linked to the requested IDs of a relation.
+
+        Uses EXISTS against the through table so matching several IDs
+        never duplicates a recipe and no DISTINCT is needed.
+        """
+        ids = self._params_to_ints(name)
+        if not ids:
+            return queryset
+        links = getattr(Recipe, name).through.objects.filter(
+            recipe_id=OuterRef('pk'),
+        )
+        if self.request.query_params.get('match') == 'all':
+            for related_id in ids:
+                queryset = queryset.filter(
+                    Exists(links.filter(**{column: related_id}))
+                )
+            return queryset
+        return queryset.filter(
+            Exists(links.filter(**{f'{column}__in': ids}))
+        )
+
+    def _search(self, queryset):
+        """Filter to recipes matching ``search``, annotated with a rank."""
+        term = self.request.query_params.get('search')
+        if not term:
+            return queryset
+        query = SearchQuery(term, config='english', search_type='websearch')
+        # ts_rank returns a real; cast it so the rank stored in the cursor
+        # round-trips exactly when compared on the next page
+        return queryset.filter(search_vector=query).annotate(
+            rank=Cast(SearchRank(F('search_vector'), query), FloatField()),
+        )
 
     def get_queryset(self):
         """Retreive recipes for authenticated user."""
-        # filter by the user passed in
-        return self.queryset.filter(user=self.request.user).order_by('-id')
+        # filter by the user's id, which a signed token carries without
+        # loading the user
+        queryset = self.queryset.filter(user_id=self.request.user.pk)
+        nested = self.nested_fields
+        if self.action == 'list':
+            queryset = self._filter_related(queryset, 'tags', 'tag_id')
+            queryset = self._filter_related(
+                queryset, 'ingredients', 'ingredient_id'
+            )
+            queryset = self._search(queryset)
+        if self.action in ('list', 'retrieve'):
+            # load only the columns and relations the client asked for
+            fields = serializers.requested_fields(
+                self.request,
+                self.get_serializer_class().Meta.fields,
+            )
+            columns = [name for name in fields if name not in nested]
+            nested = [name for name in nested if name in fields]
+            queryset = queryset.only('id', *columns)
+        # prefetch nested tags and ingredients so the serializer does not
+        # run two extra queries per recipe
+        queryset = queryset.prefetch_related(*nested)
+        if 'rank' in queryset.query.annotations:
+            return queryset.order_by('-rank', '-id')
+        return queryset.order_by('-id')
     
     def get_serializer_class(self):
         """Return the serializer class for request"""
@@ -40,17 +179,97 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-class BaseRecipeAttrViewSet(mixins.DestroyModelMixin,
+    @extend_schema(request=serializers.RecipeDetailSerializer(many=True))
+    @action(methods=['POST'], detail=False, url_path='bulk')
+    def bulk_create(self, request):
+        """Create many recipes in one transaction.
+
+        Valid items are created even when others fail validation; the
+        response lists the outcome of each item by its index.
+        """
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError({'non_field_errors': [
+                'Expected a non-empty list of recipes.'
+            ]})
+        if len(items) > settings.RECIPE_BULK_MAX_ITEMS:
+            raise ValidationError({'non_field_errors': [
+                f'At most {settings.RECIPE_BULK_MAX_ITEMS} recipes '
+                f'can be created at once.'
+            ]})
+
+        results = []
+        valid = []
+        for index, item in enumerate(items):
+            serializer = self.get_serializer(data=item)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                results.append({'index': index, 'errors': serializer.errors})
+
+        recipes = serializers.bulk_create_recipes(
+            request.user,
+            [data for _, data in valid],
+        )
+        results.extend(
+            {'index': index, 'id': recipe.id}
+            for (index, _), recipe in zip(valid, recipes)
+        )
+        results.sort(key=lambda result: result['index'])
+
+        if not valid:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif len(valid) < len(items):
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED
+        return Response(
+            {
+                'created': len(valid),
+                'failed': len(items) - len(valid),
+                'results': results,
+            },
+            status=response_status,
+        )
+
+    @extend_schema(responses={
+        (200, 'application/json'): OpenApiTypes.BINARY,
+        (200, 'application/x-ndjson'): OpenApiTypes.BINARY,
+    })
+    @action(
+        methods=['GET'],
+        detail=False,
+        url_path='export',
+        renderer_classes=[ORJSONRenderer, NDJSONRenderer],
+    )
+    def export(self, request):
+        """Stream every recipe of the user as a JSON array or NDJSON.
+
+        Send ``Accept: application/x-ndjson`` or ``?format=ndjson`` for
+        one recipe per line, and ``Accept-Encoding: gzip`` to compress.
+        """
+        return export_response(request, settings.RECIPE_EXPORT_CHUNK_SIZE)
+
+class BaseRecipeAttrViewSet(ReplicaReadMixin,
+                            ConditionalMixin,
+                 mixins.DestroyModelMixin,
                  mixins.UpdateModelMixin, 
                  mixins.ListModelMixin, 
                  viewsets.GenericViewSet):
     """Base viewset for recipe attributes."""
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = API_AUTHENTICATION_CLASSES
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         """Filter queryset to authenticated user"""
-        return self.queryset.filter(user=self.request.user).order_by('-name')
+        queryset = self.queryset.filter(user_id=self.request.user.pk)
+        if self.action == 'list':
+            fields = serializers.requested_fields(
+                self.request,
+                self.serializer_class.Meta.fields,
+            )
+            queryset = queryset.only('id', *fields)
+        return queryset.order_by('-name')
     
     
 class TagViewSet(BaseRecipeAttrViewSet):
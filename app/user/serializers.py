@@ -1,13 +1,26 @@
 """Serializers for the user API View"""
 
-from django.contrib.auth import (
-    get_user_model,
-    authenticate,
-    )
+from django.contrib.auth import get_user_model
 
 from django.utils.translation import gettext as _
 
 from rest_framework import serializers
+from rest_framework.exceptions import Throttled
+
+from core.hashing import (
+    PoolSaturated,
+    authenticate_user,
+    set_password,
+)
+
+
+def _hashing_busy():
+    """Return the error for a saturated password hash pool."""
+    return Throttled(
+        wait=1,
+        detail=_('Too many logins in progress, please try again.'),
+    )
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for the user object."""
@@ -23,7 +36,10 @@ class UserSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         """Create and return a user with encrypted password."""
         # overwrite the create method to create user using the model we defined
-        return get_user_model().objects.create_user(**validated_data)
+        try:
+            return get_user_model().objects.create_user(**validated_data)
+        except PoolSaturated:
+            raise _hashing_busy()
     
     def update(self, instance, validated_data):
         """Update and return user"""
@@ -34,7 +50,10 @@ class UserSerializer(serializers.ModelSerializer):
 
         # set the password using the set_password method
         if password:
-            user.set_password(password)
+            try:
+                set_password(user, password)
+            except PoolSaturated:
+                raise _hashing_busy()
             user.save()
         
         return user
@@ -51,14 +70,21 @@ class AuthTokenSerializer(serializers.Serializer):
         """Validate and authenticate the user."""
         email = attrs.get('email')
         password = attrs.get('password')
-        user = authenticate(
-            request=self.context.get('request'),
-            username=email,
-            password=password,
-        )
+        try:
+            # hash on the bounded pool rather than the request thread
+            user = authenticate_user(
+                self.context.get('request'), email, password,
+            )
+        except PoolSaturated:
+            raise _hashing_busy()
         if not user:
             msg = _('Unable to authenticate with provided credentials.')
             raise serializers.ValidationError(msg, code='authorization')
         
         attrs['user'] = user
-        return attrs
\ No newline at end of file
+        return attrs
+
+
+class RefreshTokenSerializer(serializers.Serializer):
+    """Serializer for a refresh token"""
+    refresh = serializers.CharField(trim_whitespace=False)
@@ -2,10 +2,14 @@
 Tests for the user API.
 '''
 
-from django.test import TestCase
+from django.test import (
+    TestCase,
+    override_settings,
+)
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 from rest_framework import status
 
@@ -81,6 +85,30 @@ class PublicUserApiTests(TestCase):
         self.assertIn('token', res.data)
         self.assertEqual(res.status_code, status.HTTP_200_OK)    
 
+    def test_create_token_reuses_existing_token(self):
+        """Test logging in again keeps other devices signed in."""
+        create_user(email='test@example.com', password='goodpass123')
+        payload = {'email': 'test@example.com', 'password': 'goodpass123'}
+
+        first = self.client.post(TOKEN_URL, payload)
+        second = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(first.data['token'], second.data['token'])
+
+    @override_settings(AUTH_TOKEN_ROTATE_ON_LOGIN=True)
+    def test_create_token_rotates_existing_token(self):
+        """Test logging in again replaces the previous token."""
+        user = create_user(email='test@example.com', password='goodpass123')
+        payload = {'email': 'test@example.com', 'password': 'goodpass123'}
+
+        first = self.client.post(TOKEN_URL, payload)
+        second = self.client.post(TOKEN_URL, payload)
+
+        self.assertNotEqual(first.data['token'], second.data['token'])
+        token = Token.objects.get(user=user)
+        self.assertEqual(token.key, second.data['token'])
+        self.assertIsNotNone(second.data['expires'])
+
     def test_create_token_bad_credentials(self):
         """Test returns error if credentials invalid."""
         create_user(email='test@example.com', password='goodpass')
@@ -1,13 +1,37 @@
 """
 Views for the user API.
 """
+from django.conf import settings
+from django.db import transaction
+
+from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
 from rest_framework import generics
-from rest_framework import authentication, permissions
+from rest_framework import permissions
+from rest_framework import status
+from rest_framework import views
+
+from core.authentication import (
+    API_AUTHENTICATION_CLASSES,
+    token_expired,
+    token_expires_at,
+)
+from core.routers import ReplicaReadMixin
+from core.tokens import (
+    AccessToken,
+    InvalidToken,
+    delete_refresh_token,
+    issue_token_pair,
+    revoke_access_token,
+    rotate_refresh_token,
+)
 from user.serializers import (
     UserSerializer,
     AuthTokenSerializer,
+    RefreshTokenSerializer,
 )
 
 
@@ -19,11 +43,81 @@ class CreateTokenView(ObtainAuthToken):
     """Create a new auth token for user."""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.serializer_class(
+            data=request.data,
+            context={'request': request},
+        )
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+        if settings.AUTH_TOKEN_MODE == 'signed':
+            return Response(issue_token_pair(user))
+
+        with transaction.atomic():
+            # a concurrent first login that inserts the token first is
+            # read back and locked instead of failing the unique user
+            token, created = Token.objects.select_for_update().get_or_create(
+                user=user,
+            )
+            # issue a fresh token when rotating or when the old one expired
+            if not created and (
+                settings.AUTH_TOKEN_ROTATE_ON_LOGIN or token_expired(token)
+            ):
+                token.delete()
+                token = Token.objects.create(user=user)
+
+        expires = token_expires_at(token)
+        return Response({
+            'token': token.key,
+            'expires': expires.isoformat() if expires else None,
+        })
+
+class RefreshTokenView(views.APIView):
+    """Exchange a refresh token for a new signed token pair."""
+    authentication_classes = []
+    permission_classes = []
+    serializer_class = RefreshTokenSerializer
+
+    def get_authenticate_header(self, request):
+        # keep rejected refresh tokens a 401 without any authenticators
+        return 'Bearer'
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            tokens = rotate_refresh_token(serializer.validated_data['refresh'])
+        except InvalidToken as exc:
+            raise AuthenticationFailed(str(exc))
+        return Response(tokens)
+
+class RevokeTokenView(views.APIView):
+    """Log out by revoking the tokens used for this request."""
+    authentication_classes = API_AUTHENTICATION_CLASSES
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = RefreshTokenSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.serializer_class(
+            data=request.data,
+            partial=True,
+        )
+        serializer.is_valid(raise_exception=True)
+        if isinstance(request.auth, AccessToken):
+            revoke_access_token(request.auth)
+        elif isinstance(request.auth, Token):
+            request.auth.delete()
+        refresh = serializer.validated_data.get('refresh')
+        if refresh:
+            delete_refresh_token(refresh, request.user.pk)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(ReplicaReadMixin, generics.RetrieveUpdateAPIView):
     """Manage the authenticated user."""
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = API_AUTHENTICATION_CLASSES
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):